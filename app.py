@@ -1,9 +1,28 @@
+import functools
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
+
+from calidad_aire.schema import COVERAGE_COL, DASHBOARD_COLS, SENSOR_COLS, SITE_COL, TIMESTAMP_COL
+from calidad_aire.dataset import DATA_GLOB, MMAP_DIR, Dataset, discover
+from calidad_aire.compliance import ComplianceEngine
+from calidad_aire.correlation import DailyHistograms, correlation_matrix
+from calidad_aire.export import FORMATS, export_bytes
+from calidad_aire.figures import box_figure, correlation_figure, density_figure, extend_live_figure, live_figure
+from calidad_aire.gaps import format_duration
+from calidad_aire.live import LIVE_SOURCE, Follower, open_source
+from calidad_aire.pipeline import (
+    NO_RESAMPLE, PM_LABELS, RESAMPLE_OPTIONS, co2_chart_figure, combine_sites, date_bounds,
+    event_counts, format_episodes, format_stats, pm_chart_figure, profile_chart_figures,
+    range_onsets, resampled, series_chart_figure, site_exceedances
+)
+from calidad_aire.profile import hourly_profile
+from calidad_aire.profiling import PROFILE_ENV, PROFILE_LOG, RECORD_COLUMNS, Profiler
+from calidad_aire.query import time_slice
+from calidad_aire.rollup import RollupEngine
+from calidad_aire.stats import describe
+from calidad_aire.table import page_count, sort_order, table_page
 
 # =====================================================
 # Configuración general
@@ -14,6 +33,44 @@ st.set_page_config(
     page_icon="🌬️"
 )
 
+# Perfilado opcional de cada ejecución (interruptor al final de la barra lateral)
+prof = Profiler(st.session_state.get("perfilado", PROFILE_ENV))
+
+def profile_panel(run_prof: Profiler, title: str, **log_extra):
+    # Añade el registro al log JSONL y lo muestra en un panel plegable
+    try:
+        run_prof.write_log(**log_extra)
+        log_note = f"Registro añadido a `{PROFILE_LOG}`"
+    except OSError as exc:
+        log_note = f"No se pudo escribir `{PROFILE_LOG}`: {exc}"
+    with st.expander(f"{title} ({run_prof.total_seconds:.2f} s)"):
+        timings = pd.DataFrame(run_prof.rows(), columns=RECORD_COLUMNS).rename(columns={
+            "etapa": "Etapa",
+            "segundos": "Tiempo (s)",
+            "filas_entrada": "Filas entrada",
+            "filas_salida": "Filas salida",
+            "pico_mb": "Pico memoria (MB)",
+        })
+        st.dataframe(timings.round(4), use_container_width=True, hide_index=True)
+        st.caption(log_note)
+
+def profiled_view(name: str):
+    # Al cambiar un widget de una vista solo se vuelve a ejecutar su fragmento, no
+    # el final del script: cada ejecución de la vista lleva su propio perfilador,
+    # que escribe su registro y su panel dentro del fragmento
+    def wrap(view):
+        @functools.wraps(view)
+        def run():
+            view_prof = Profiler(st.session_state.get("perfilado", PROFILE_ENV))
+            try:
+                view(view_prof)
+                if view_prof.enabled:
+                    profile_panel(view_prof, "⏱️ Perfilado de la vista", vista=name, version=data_key)
+            finally:
+                view_prof.close()
+        return run
+    return wrap
+
 # =====================================================
 # Portada profesional
 # =====================================================
@@ -51,7 +108,8 @@ doméstico real, monitorizando tanto **parámetros ambientales básicos** (tempe
 concentración de CO₂) como **partículas en suspensión** (PM 1.0, PM 2.5, PM 4.0, PM 10).
 
 El sistema de adquisición de datos, diseñado e implementado por el grupo, integra múltiples sensores 
-comerciales configurados con una **frecuencia de muestreo constante de 30 minutos**. Los datos se 
+comerciales que registran una muestra **cada ~22 segundos** (la cadencia real no es constante y hay 
+cortes de adquisición; la barra lateral muestra la cadencia medida y la cobertura). Los datos se 
 analizan de forma descriptiva para identificar patrones asociados a la ocupación del espacio, 
 ventilación natural y calidad del aire respirado.
 """)
@@ -87,7 +145,8 @@ with st.expander("📖 Información sobre partículas PM y valores de referencia
 
 st.info("""
 ℹ️ **Nota importante:** Este dashboard presenta análisis histórico de datos. 
-No constituye un sistema de monitorización en tiempo real.
+El modo de seguimiento en vivo (barra lateral) muestra las últimas muestras del sistema de 
+adquisición, pero no constituye un sistema de alarmas.
 """)
 
 st.divider()
@@ -95,28 +154,95 @@ st.divider()
 # =====================================================
 # Carga de datos
 # =====================================================
-CSV_PATH = "data/mediciones_completas_etiquetadas.csv"
-
-@st.cache_data(show_spinner=False)
-def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-    df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
-    
-    # Convertir todas las columnas numéricas (nombres correctos según tu CSV)
-    numeric_cols = ["temperatura_C", "humedad_relativa_pct", "CO2_ppm", 
-                    "PM1_ug_m3", "PM2_5_ug_m3", "PM4_ug_m3", "PM10_ug_m3"]
-    
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    
-    return df
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_dataset(pattern: str, paths: tuple) -> Dataset:
+    # Un cargador por fichero y proceso: en cada rerun solo se parsean las
+    # filas añadidas a cada CSV desde la última lectura. Los ficheros entran
+    # en la clave: uno nuevo en ``data/`` crea otro Dataset y suelta el anterior
+    return Dataset(paths, columns=DASHBOARD_COLS)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def combined_range(_frames: dict, key: tuple) -> pd.DataFrame:
+    # Muestras del rango de los sitios elegidos en orden temporal; key = (datos,
+    # inicio, fin). Es la única copia de filas: una entrada, sustituida al cambiar
+    return combine_sites(_frames)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_rollup(site: str) -> RollupEngine:
+    # Agregados por intervalo de un sitio; solo agrega las filas nuevas
+    return RollupEngine()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def channel_stats(_df: pd.DataFrame, key: tuple, columns: tuple) -> pd.DataFrame:
+    return describe(_df, columns)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_file(_df: pd.DataFrame, key: tuple, columns: tuple, fmt: str) -> bytes:
+    # Fichero de descarga por (datos, rango, resample, columnas, formato)
+    return export_bytes(_df[list(columns)], fmt)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def sorted_rows(_df: pd.DataFrame, key: tuple, column: str, ascending: bool) -> np.ndarray:
+    # Orden de la tabla por columna; se comparte sin copiar entre reruns
+    return sort_order(_df, column, ascending)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def hour_profile(_df: pd.DataFrame, _tier, key: tuple, columns: tuple) -> pd.DataFrame:
+    # Perfil horario por (datos, rango); key = (versión, inicio, fin)
+    _, start, end = key
+    return hourly_profile(_df, columns, tier=_tier, start=start, end=end)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_compliance(site: str) -> ComplianceEngine:
+    # Medias móviles de un sitio (nunca mezclan salas); solo procesa las filas
+    # nuevas y guarda las medias junto a las columnas, en MMAP_DIR
+    return ComplianceEngine(MMAP_DIR)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def exceedance_table(_frames: dict, _rolling: dict, key: tuple) -> pd.DataFrame:
+    # Episodios de superación por (datos, rango); key = (versión, inicio, fin)
+    _, start, end = key
+    return site_exceedances(_frames, _rolling, start, end)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def event_onsets(_df: pd.DataFrame, key: tuple) -> pd.DataFrame:
+    # Inicio de cada evento detectado en el rango; key = (versión, inicio, fin)
+    _, start, end = key
+    return range_onsets(_df, start, end)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def channel_correlation(_df: pd.DataFrame, key: tuple, columns: tuple, method: str) -> pd.DataFrame:
+    # Matriz de correlación por (datos, rango) y método
+    return correlation_matrix(_df, columns, method)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def pair_histograms(_frames: dict, key: tuple) -> DailyHistograms:
+    # Histogramas 2-D diarios por (versión, canal x, canal y, intervalos), sobre
+    # todo el histórico de los sitios; solo se combinan las tres columnas usadas
+    _, x_col, y_col, bins = key
+    pairs = combine_sites({site: f[[TIMESTAMP_COL, x_col, y_col]] for site, f in _frames.items()})
+    return DailyHistograms.build(pairs, x_col, y_col, bins)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def pair_density(_hist: DailyHistograms, key: tuple) -> np.ndarray:
+    # Suma de los días del rango; key = (versión, x, y, intervalos, inicio, fin)
+    *_, start, end = key
+    return _hist.range_counts(start, end)
+
+data_paths = tuple(discover(DATA_GLOB))
+if not data_paths:
+    st.error(f"No se encontraron ficheros de mediciones con el patrón `{DATA_GLOB}`.")
+    st.stop()
 
 with st.spinner("🔄 Cargando datos del sistema de monitorización..."):
-    df = load_data(CSV_PATH)
+    with prof.stage("carga") as stage:
+        dataset = get_dataset(DATA_GLOB, data_paths)
+        site_data = dataset.refresh()
+        versions = dataset.versions
+        site_gaps = dataset.gaps  # cadencia y cortes, que mantiene cada cargador
+        n_loaded = stage.rows_out = sum(len(f) for f in site_data.values())
 
-st.success(f"✅ Datos cargados correctamente: **{len(df):,}** registros")
+st.success(f"✅ Datos cargados correctamente: **{n_loaded:,}** registros")
 
 # =====================================================
 # Sidebar: filtros
@@ -128,43 +254,121 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-min_dt, max_dt = df["timestamp"].min(), df["timestamp"].max()
+sites = dataset.sites
+if len(dataset.sites) > 1:
+    sites = st.sidebar.multiselect("📍 Sitios", dataset.sites, default=dataset.sites)
+    if not sites:
+        st.warning("Selecciona al menos un sitio.")
+        st.stop()
+
+# Columnas de cada sitio, sin copia: la pirámide, los cortes y las medias
+# móviles se calculan por sitio para no mezclar salas con cadencias y niveles distintos
+frames = {site: site_data[site] for site in sites}
+n_rows = sum(len(f) for f in frames.values())
+
+# Versión de los datos mostrados: cambia con filas nuevas o con otra selección de sitios
+data_key = tuple((site, versions[site]) for site in sites)
+with prof.stage("pirámide", rows_in=n_rows):
+    pyramids = {site: get_rollup(site).update(f, versions[site][0]) for site, f in frames.items()}
+gaps = {site: site_gaps[site] for site in sites}
+
+stamps = [f[TIMESTAMP_COL] for f in frames.values() if len(f)]
+min_dt, max_dt = min(t.iloc[0] for t in stamps), max(t.iloc[-1] for t in stamps)
 start_date, end_date = st.sidebar.date_input(
     "📅 Rango de fechas",
     value=(min_dt.date(), max_dt.date())
 )
 
-start_ts = pd.to_datetime(start_date, utc=True)
-end_ts = pd.to_datetime(end_date, utc=True) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+start_ts, end_ts = date_bounds(start_date, end_date)
 
-df_f = df[(df["timestamp"] >= start_ts) & (df["timestamp"] <= end_ts)].copy()
+# Búsqueda binaria sobre las marcas de tiempo ordenadas: slice sin copia de
+# cada sitio; con varios sitios, el rango combinado es una copia (solo del rango)
+with prof.stage("rango de fechas", rows_in=n_rows) as stage:
+    site_ranges = {site: time_slice(f, start_ts, end_ts) for site, f in frames.items()}
+    df_range = combined_range(site_ranges, (data_key, start_ts, end_ts))
+    stage.rows_out = len(df_range)
+df_f = df_range
+site_f = site_ranges
 
 resample = st.sidebar.selectbox(
     "⏱️ Intervalo de resample (promedio)",
-    ["Sin resample", "30min", "1H", "2H", "6H", "1D"],
+    RESAMPLE_OPTIONS,
     index=1,
     help="Agrupa los datos calculando el promedio en el intervalo seleccionado"
 )
 
-if resample != "Sin resample":
-    numeric_cols = [c for c in df_f.columns if c not in ["timestamp", "Evento"]]
-    df_f = (
-        df_f.set_index("timestamp")[numeric_cols]
-        .resample(resample)
-        .mean()
-        .reset_index()
-    )
+if resample != NO_RESAMPLE:
+    # Medias por cubo a partir de la pirámide precalculada (slice, sin recorrer las muestras)
+    # Cada sitio con su pirámide y su cadencia; las tablas los juntan con la columna ``sitio``
+    with prof.stage("resample", rows_in=len(df_range)) as stage:
+        site_f = {
+            site: resampled(site_ranges[site], pyramids[site], resample, start_ts, end_ts, gaps[site])
+            for site in frames
+        }
+        df_f = combine_sites(site_f)
+        stage.rows_out = len(df_f)
+
+# Identifica la selección actual para las cachés de resultados derivados
+view_key = (data_key, start_ts, end_ts, resample)
+
+# Las series sin resample se cortan en los cortes de adquisición; con
+# resample, los cubos vacíos ya son NaN
+line_gaps = gaps if resample == NO_RESAMPLE else None
+quality = {site: gaps[site].summary(start_ts, end_ts, len(site_ranges[site])) for site in frames}
 
 st.sidebar.divider()
 st.sidebar.markdown(f"""
 <div style='background-color: #f1f5f9; padding: 1rem; border-radius: 8px;'>
-    <p style='margin: 0; color: #475569;'><strong>📊 Total:</strong> {len(df):,} registros</p>
+    <p style='margin: 0; color: #475569;'><strong>📊 Total:</strong> {n_rows:,} registros</p>
     <p style='margin: 0.5rem 0 0 0; color: #475569;'><strong>📊 Filtrados:</strong> {len(df_f):,} registros</p>
     <p style='margin: 0.5rem 0 0 0; color: #475569;'><strong>📅 Período:</strong><br>
     {min_dt.strftime('%d/%m/%Y')} - {max_dt.strftime('%d/%m/%Y')}</p>
 </div>
 """, unsafe_allow_html=True)
 
+# Calidad de los datos del rango: cadencia medida, cortes y cobertura (por sitio)
+def coverage_text(q: dict) -> str:
+    return f"{q['cobertura']:.1%}" if np.isfinite(q["cobertura"]) else "—"
+
+if len(quality) == 1:
+    (q,) = quality.values()
+    quality_lines = f"""
+    <p style='margin: 0.5rem 0 0 0; color: #475569;'>Cadencia medida: {format_duration(q['cadencia_s'])}</p>
+    <p style='margin: 0.3rem 0 0 0; color: #475569;'>Cobertura: {coverage_text(q)}</p>
+    <p style='margin: 0.3rem 0 0 0; color: #475569;'>Cortes: {q['cortes']:,} ({format_duration(q['sin_datos_s'])} sin datos)</p>
+    <p style='margin: 0.3rem 0 0 0; color: #475569;'>Mayor corte: {format_duration(q['mayor_corte_s'])}</p>"""
+else:
+    quality_lines = "".join(
+        f"""
+    <p style='margin: 0.3rem 0 0 0; color: #475569;'><strong>{site}</strong>: cadencia {format_duration(q['cadencia_s'])} · cobertura {coverage_text(q)} · {q['cortes']:,} cortes</p>"""
+        for site, q in quality.items()
+    )
+st.sidebar.markdown(f"""
+<div style='background-color: #f1f5f9; padding: 1rem; border-radius: 8px; margin-top: 0.5rem;'>
+    <p style='margin: 0; color: #475569;'><strong>🩺 Calidad de los datos</strong></p>{quality_lines}
+</div>
+""", unsafe_allow_html=True)
+
+st.sidebar.toggle(
+    "⏱️ Perfilado de rendimiento",
+    value=PROFILE_ENV,
+    key="perfilado",
+    help="Mide el tiempo y la memoria de cada etapa y los guarda en un log JSONL"
+)
+
+live_on = st.sidebar.toggle(
+    "📡 Seguimiento en vivo",
+    value=False,
+    key="en_vivo",
+    help="Sigue las mediciones nuevas del sistema de adquisición y actualiza los gráficos cada pocos segundos"
+)
+if live_on:
+    live_source = st.sidebar.text_input(
+        "Fuente en vivo",
+        value=LIVE_SOURCE or str(data_paths[0]),
+        help="Ruta de un CSV de mediciones o tcp://host:puerto (una medición JSON por línea)"
+    )
+
 if df_f.empty:
     st.error("❌ No hay datos en el rango seleccionado.")
     st.stop()
@@ -181,8 +385,13 @@ has_temp = "temperatura_C" in df_f.columns
 has_hum = "humedad_relativa_pct" in df_f.columns
 has_co2 = "CO2_ppm" in df_f.columns
 
+# Estadísticas de todos los canales en una pasada: alimentan los KPIs, la
+# tabla de estadísticas y los diagramas de caja
+with prof.stage("estadísticas", rows_in=len(df_f)):
+    stats_all = channel_stats(df_f, view_key, tuple(c for c in SENSOR_COLS if c in df_f.columns))
+
 if has_temp:
-    temp_mean = df_f["temperatura_C"].mean()
+    temp_mean = stats_all.loc["temperatura_C", "mean"]
     with col1:
         st.markdown(f"""
         <div style='background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%); 
@@ -196,7 +405,7 @@ if has_temp:
         """, unsafe_allow_html=True)
 
 if has_hum:
-    hum_mean = df_f["humedad_relativa_pct"].mean()
+    hum_mean = stats_all.loc["humedad_relativa_pct", "mean"]
     with col2:
         st.markdown(f"""
         <div style='background: linear-gradient(135deg, #dbeafe 0%, #bfdbfe 100%); 
@@ -210,7 +419,7 @@ if has_hum:
         """, unsafe_allow_html=True)
 
 if has_co2:
-    co2_mean = df_f["CO2_ppm"].mean()
+    co2_mean = stats_all.loc["CO2_ppm", "mean"]
     with col3:
         st.markdown(f"""
         <div style='background: linear-gradient(135deg, #e9d5ff 0%, #d8b4fe 100%); 
@@ -239,7 +448,7 @@ pm_cols = {
 
 for pm_col, (label, col, color) in pm_cols.items():
     if pm_col in df_f.columns:
-        pm_mean = df_f[pm_col].mean()
+        pm_mean = stats_all.loc[pm_col, "mean"]
         with col:
             st.markdown(f"""
             <div style='background: linear-gradient(135deg, {color}22 0%, {color}44 100%); 
@@ -256,50 +465,124 @@ for pm_col, (label, col, color) in pm_cols.items():
 st.divider()
 
 # =====================================================
-# Tabs de visualización
+# Seguimiento en vivo
 # =====================================================
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📈 Parámetros Básicos", 
-    "🌫️ Partículas PM",
-    "⏰ Perfil Horario",
-    "📊 Estadísticas",
-    "🧾 Datos Crudos"
-])
-
-with tab1:
+LIVE_REFRESH_S = 2
+LIVE_CHANNELS = {
+    "CO2_ppm": ("CO₂ (ppm)", "#a855f7"),
+    "PM2_5_ug_m3": ("PM 2.5 (µg/m³)", "#f97316"),
+    "temperatura_C": ("Temperatura (°C)", "#f59e0b"),
+    "humedad_relativa_pct": ("Humedad (%)", "#3b82f6"),
+}
+
+@st.cache_resource(show_spinner=False, max_entries=4, on_release=Follower.stop)
+def get_follower(source: str) -> Follower:
+    # Un lector en segundo plano por proceso y fuente, compartido por las sesiones;
+    # al expulsar una fuente (p. ej. un puerto mal escrito) se para su hilo
+    return Follower(open_source(source)).start()
+
+@st.fragment(run_every=LIVE_REFRESH_S)
+@profiled_view("vivo")
+def view_live(prof: Profiler):
+    try:
+        follower = get_follower(live_source)
+    except OSError as exc:
+        st.error(f"❌ No se puede abrir la fuente `{live_source}`: {exc}")
+        return
+    ring = follower.buffer
+
+    # Por sesión solo se guarda la figura y la secuencia de la última lectura:
+    # cada refresco añade a las trazas las muestras nuevas del buffer
+    state = st.session_state.get("vivo")
+    if state is None or state["fuente"] != live_source:
+        state = {"fuente": live_source, "secuencia": 0, "figura": live_figure(LIVE_CHANNELS)}
+        st.session_state["vivo"] = state
+    with prof.stage("vivo") as stage:
+        total, epoch, values = ring.since(state["secuencia"])
+        extend_live_figure(
+            state["figura"], epoch.view("datetime64[ns]"),
+            {col: values[col] for col in LIVE_CHANNELS}, ring.capacity
+        )
+        state["secuencia"] = total
+        stage.rows_out = len(epoch)
+
+    fig = state["figura"]
+    cols = st.columns(len(LIVE_CHANNELS) + 1)
+    for col_st, trace in zip(cols, fig.data):
+        col_st.metric(trace.name, f"{trace.y[-1]:.1f}" if len(trace.y) and np.isfinite(trace.y[-1]) else "—")
+    last = pd.Timestamp(fig.data[0].x[-1], tz="UTC") if len(fig.data[0].x) else None
+    cols[-1].metric("Última muestra", last.strftime("%d/%m %H:%M:%S") if last is not None else "—")
+
+    if follower.error:
+        st.warning(f"⚠️ Fuente `{live_source}`: {follower.error}. Se reintenta automáticamente.")
+    if not len(ring):
+        st.info("Esperando mediciones nuevas de la fuente…")
+    st.plotly_chart(fig, use_container_width=True, key="grafico_vivo")
+    st.caption(
+        f"Fuente: `{live_source}` · {len(ring):,} muestras en la ventana (máx. {ring.capacity:,}) · "
+        f"{ring.total:,} recibidas" + (f" · última medición #{follower.last_id}" if follower.last_id is not None else "")
+    )
+
+if live_on:
+    st.markdown("## 📡 Seguimiento en vivo")
+    view_live()
+    st.divider()
+
+# =====================================================
+# Vistas
+# =====================================================
+# Canales disponibles para las vistas
+pm_available = [col for col in ["PM1_ug_m3", "PM2_5_ug_m3", "PM4_ug_m3", "PM10_ug_m3"] if col in df_f.columns]
+
+numeric_cols_available = []
+if has_temp:
+    numeric_cols_available.append("temperatura_C")
+if has_hum:
+    numeric_cols_available.append("humedad_relativa_pct")
+if has_co2:
+    numeric_cols_available.append("CO2_ppm")
+numeric_cols_available.extend(pm_available)
+
+# Figuras memorizadas por sus entradas reales: key = view_key (datos, rango,
+# resample) más los parámetros propios de cada figura
+@st.cache_resource(show_spinner=False, max_entries=16)
+def co2_chart(_frames: dict, _gaps, _events, key: tuple):
+    # _frames = {sitio: filas}: una traza por sitio
+    return co2_chart_figure(_frames, _gaps, _events)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def series_chart(_frames: dict, _gaps, key: tuple, column: str):
+    return series_chart_figure(_frames, column, _gaps)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def pm_chart(_frames: dict, _gaps, _episodes, _events, key: tuple, columns: tuple):
+    return pm_chart_figure(_frames, columns, _gaps, episodes=_episodes, events=_events)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def profile_charts(_hourly: pd.DataFrame, key: tuple, split_week: bool, pm_columns: tuple):
+    # Figuras del perfil horario; key = (versión, inicio, fin)
+    return profile_chart_figures(_hourly, split_week, pm_columns)
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def box_chart(_stats: pd.DataFrame, key: tuple, column: str):
+    return box_figure(column, _stats.loc[column])
+
+@st.fragment
+@profiled_view("básicos")
+def view_basic(prof: Profiler):
     st.markdown("### Evolución Temporal de Parámetros Básicos")
+    events_on = event_onsets(df_range, (data_key, start_ts, end_ts))
     
     # Gráfico CO₂
     if has_co2:
         st.markdown("#### Concentración de CO₂")
-        fig_co2 = go.Figure()
-        
-        fig_co2.add_hrect(y0=0, y1=800, fillcolor="green", opacity=0.08, line_width=0)
-        fig_co2.add_hrect(y0=800, y1=1200, fillcolor="yellow", opacity=0.08, line_width=0)
-        fig_co2.add_hrect(y0=1200, y1=df_f["CO2_ppm"].max()*1.1, fillcolor="red", opacity=0.08, line_width=0)
-        
-        fig_co2.add_trace(go.Scatter(
-            x=df_f["timestamp"], 
-            y=df_f["CO2_ppm"],
-            mode='lines',
-            name='CO₂',
-            line=dict(color='#667eea', width=2.5),
-            fill='tozeroy',
-            fillcolor='rgba(102, 126, 234, 0.15)'
-        ))
-        
-        fig_co2.add_hline(y=800, line_dash="dash", line_color="green", line_width=2)
-        fig_co2.add_hline(y=1200, line_dash="dash", line_color="red", line_width=2)
-        
-        fig_co2.update_layout(
-            title="Concentración de CO₂",
-            xaxis_title="Fecha y hora",
-            yaxis_title="CO₂ (ppm)",
-            template='plotly_white',
-            height=500
-        )
-        fig_co2.update_xaxes(rangeslider=dict(visible=True))
-        st.plotly_chart(fig_co2, use_container_width=True)
+        with prof.stage("figura CO₂", rows_in=len(df_f)):
+            st.plotly_chart(co2_chart(site_f, line_gaps, events_on, view_key), use_container_width=True)
+        counts = event_counts(events_on)
+        if counts:
+            st.caption("Eventos detectados en el rango: " + " · ".join(
+                f"{kind}: {n}" for kind, n in counts.items()
+            ))
     
     # Temperatura y Humedad
     colA, colB = st.columns(2)
@@ -307,227 +590,243 @@ with tab1:
     if has_temp:
         with colA:
             st.markdown("#### Temperatura")
-            fig_t = go.Figure()
-            fig_t.add_trace(go.Scatter(
-                x=df_f["timestamp"], 
-                y=df_f["temperatura_C"],
-                mode='lines',
-                line=dict(color='#f59e0b', width=2.5),
-                fill='tozeroy',
-                fillcolor='rgba(245, 158, 11, 0.15)'
-            ))
-            fig_t.update_layout(
-                xaxis_title="Fecha y hora",
-                yaxis_title="Temperatura (°C)",
-                template='plotly_white',
-                height=400
-            )
-            fig_t.update_xaxes(rangeslider=dict(visible=True))
-            st.plotly_chart(fig_t, use_container_width=True)
+            with prof.stage("figura temperatura", rows_in=len(df_f)):
+                fig_t = series_chart(site_f, line_gaps, view_key, "temperatura_C")
+                st.plotly_chart(fig_t, use_container_width=True)
     
     if has_hum:
         with colB:
             st.markdown("#### Humedad Relativa")
-            fig_h = go.Figure()
-            fig_h.add_trace(go.Scatter(
-                x=df_f["timestamp"], 
-                y=df_f["humedad_relativa_pct"],
-                mode='lines',
-                line=dict(color='#3b82f6', width=2.5),
-                fill='tozeroy',
-                fillcolor='rgba(59, 130, 246, 0.15)'
-            ))
-            fig_h.update_layout(
-                xaxis_title="Fecha y hora",
-                yaxis_title="Humedad (%)",
-                template='plotly_white',
-                height=400
-            )
-            fig_h.update_xaxes(rangeslider=dict(visible=True))
-            st.plotly_chart(fig_h, use_container_width=True)
-
-with tab2:
+            with prof.stage("figura humedad", rows_in=len(df_f)):
+                fig_h = series_chart(site_f, line_gaps, view_key, "humedad_relativa_pct")
+                st.plotly_chart(fig_h, use_container_width=True)
+
+@st.fragment
+@profiled_view("partículas")
+def view_pm(prof: Profiler):
     st.markdown("### Evolución de Partículas en Suspensión")
-    
-    # Selección de partículas a visualizar
-    pm_available = [col for col in ["PM1_ug_m3", "PM2_5_ug_m3", "PM4_ug_m3", "PM10_ug_m3"] if col in df_f.columns]
+
+    # Medias móviles de cada sitio sobre todos sus datos (las ventanas al inicio
+    # del rango usan las muestras anteriores); los episodios, solo dentro del rango
+    with prof.stage("cumplimiento OMS", rows_in=n_rows) as stage:
+        rolling = {site: get_compliance(site).update(f, versions[site][0]) for site, f in frames.items()}
+        episodes_df = exceedance_table(frames, rolling, (data_key, start_ts, end_ts))
+        stage.rows_out = len(episodes_df)
     
     if pm_available:
-        pm_labels = {
-            "PM1_ug_m3": "PM 1.0",
-            "PM2_5_ug_m3": "PM 2.5",
-            "PM4_ug_m3": "PM 4.0",
-            "PM10_ug_m3": "PM 10"
-        }
-        
+        # Selección de partículas a visualizar
         selected_pm = st.multiselect(
             "Selecciona las partículas a visualizar:",
             options=pm_available,
             default=pm_available,
-            format_func=lambda x: pm_labels.get(x, x)
+            format_func=lambda x: PM_LABELS.get(x, x)
         )
         
         if selected_pm:
-            fig_pm = go.Figure()
-            
-            colors = {
-                "PM1_ug_m3": "#ef4444",
-                "PM2_5_ug_m3": "#f97316",
-                "PM4_ug_m3": "#f59e0b",
-                "PM10_ug_m3": "#eab308"
-            }
-            
-            for pm_col in selected_pm:
-                fig_pm.add_trace(go.Scatter(
-                    x=df_f["timestamp"],
-                    y=df_f[pm_col],
-                    mode='lines',
-                    name=pm_labels[pm_col],
-                    line=dict(color=colors[pm_col], width=2.5)
-                ))
-            
-            # Líneas de referencia OMS
-            if "PM2_5_ug_m3" in selected_pm:
-                fig_pm.add_hline(y=15, line_dash="dash", line_color="orange", 
-                                annotation_text="OMS PM2.5 (24h): 15 µg/m³")
-            if "PM10_ug_m3" in selected_pm:
-                fig_pm.add_hline(y=45, line_dash="dash", line_color="red",
-                                annotation_text="OMS PM10 (24h): 45 µg/m³")
-            
-            fig_pm.update_layout(
-                title="Concentración de Partículas en Suspensión",
-                xaxis_title="Fecha y hora",
-                yaxis_title="Concentración (µg/m³)",
-                template='plotly_white',
-                height=550,
-                hovermode='x unified'
-            )
-            fig_pm.update_xaxes(rangeslider=dict(visible=True))
-            st.plotly_chart(fig_pm, use_container_width=True)
+            events_on = event_onsets(df_range, (data_key, start_ts, end_ts))
+            with prof.stage("figura PM", rows_in=len(df_f)):
+                fig_pm = pm_chart(site_f, line_gaps, episodes_df, events_on, view_key, tuple(selected_pm))
+                st.plotly_chart(fig_pm, use_container_width=True)
+            st.caption("Las zonas sombreadas indican periodos en que la media móvil de 24 h supera la guía de la OMS.")
         else:
             st.warning("Selecciona al menos una partícula para visualizar")
 
-with tab3:
+    st.markdown("#### Episodios de superación de las guías")
+    if episodes_df.empty:
+        st.success("✅ Ninguna media móvil supera las guías en el rango seleccionado.")
+    else:
+        st.dataframe(format_episodes(episodes_df), use_container_width=True, hide_index=True)
+
+@st.fragment
+@profiled_view("perfil horario")
+def view_profile(prof: Profiler):
     st.markdown("### Perfil Horario Medio")
     
-    df_f["hora"] = df_f["timestamp"].dt.hour
+    split_week = st.radio(
+        "Agrupar por",
+        ["Todos los días", "Laborables / fin de semana"],
+        horizontal=True
+    ) != "Todos los días"
+    
+    # Perfil de las muestras del rango (independiente del resample), con
+    # las medias combinadas desde el nivel horario de la pirámide
+    profile_cols = tuple(c for c in SENSOR_COLS if c in df_range.columns)
+    range_key = (data_key, start_ts, end_ts)
+    with prof.stage("perfil horario", rows_in=len(df_range)):
+        # Con varios sitios las medias se calculan sobre las muestras del rango
+        tier = pyramids[sites[0]].tiers[3600] if len(sites) == 1 else None
+        hourly = hour_profile(df_range, tier, range_key, profile_cols)
+        fig_h_co2, fig_h_pm = profile_charts(hourly, range_key, split_week, tuple(pm_available))
     
     # Perfil horario de CO₂
-    if has_co2:
+    if has_co2 and fig_h_co2 is not None:
         st.markdown("#### CO₂ por hora del día")
-        df_hourly_co2 = df_f.groupby("hora")["CO2_ppm"].mean().reset_index()
-        
-        fig_h_co2 = go.Figure()
-        fig_h_co2.add_trace(go.Scatter(
-            x=df_hourly_co2["hora"],
-            y=df_hourly_co2["CO2_ppm"],
-            mode='lines+markers',
-            line=dict(color='#667eea', width=3),
-            marker=dict(size=8)
-        ))
-        fig_h_co2.update_layout(
-            xaxis_title="Hora del día",
-            yaxis_title="CO₂ medio (ppm)",
-            template='plotly_white',
-            height=400
-        )
         st.plotly_chart(fig_h_co2, use_container_width=True)
     
     # Perfil horario de partículas
-    if pm_available:
+    if fig_h_pm is not None:
         st.markdown("#### Partículas PM por hora del día")
-        df_hourly_pm = df_f.groupby("hora")[pm_available].mean().reset_index()
-        
-        fig_h_pm = go.Figure()
-        for pm_col in pm_available:
-            fig_h_pm.add_trace(go.Scatter(
-                x=df_hourly_pm["hora"],
-                y=df_hourly_pm[pm_col],
-                mode='lines+markers',
-                name=pm_labels.get(pm_col, pm_col),
-                line=dict(width=3),
-                marker=dict(size=8)
-            ))
-        
-        fig_h_pm.update_layout(
-            xaxis_title="Hora del día",
-            yaxis_title="Concentración media (µg/m³)",
-            template='plotly_white',
-            height=400
-        )
         st.plotly_chart(fig_h_pm, use_container_width=True)
 
-with tab4:
+@st.fragment
+@profiled_view("estadísticas")
+def view_stats(prof: Profiler):
     st.markdown("### Estadísticas Descriptivas")
     
-    # Seleccionar columnas numéricas disponibles
-    numeric_cols_available = []
-    if has_temp:
-        numeric_cols_available.append("temperatura_C")
-    if has_hum:
-        numeric_cols_available.append("humedad_relativa_pct")
-    if has_co2:
-        numeric_cols_available.append("CO2_ppm")
-    numeric_cols_available.extend(pm_available)
-    
     if numeric_cols_available:
-        stats = df_f[numeric_cols_available].describe().T
-        stats = stats.round(2)
-        stats.columns = ["Recuento", "Media", "Desv. Est.", "Mínimo", "Q1 (25%)", "Mediana", "Q3 (75%)", "Máximo"]
-        
-        st.dataframe(stats, use_container_width=True)
+        st.dataframe(format_stats(stats_all, numeric_cols_available), use_container_width=True)
         
         st.markdown("### Diagramas de Caja (Box Plots)")
         
         n_cols = len(numeric_cols_available)
         cols = st.columns(min(n_cols, 4))
         
-        for idx, col_name in enumerate(numeric_cols_available[:4]):
-            with cols[idx % 4]:
-                fig_box = px.box(df_f, y=col_name)
-                fig_box.update_layout(
-                    title=col_name,
-                    height=350,
-                    template='plotly_white',
-                    showlegend=False
-                )
-                st.plotly_chart(fig_box, use_container_width=True)
-
-with tab5:
+        with prof.stage("diagramas de caja"):
+            for idx, col_name in enumerate(numeric_cols_available[:4]):
+                with cols[idx % 4]:
+                    st.plotly_chart(box_chart(stats_all, view_key, col_name), use_container_width=True)
+
+@st.fragment
+@profiled_view("datos")
+def view_table(prof: Profiler):
     st.markdown("### Tabla de Datos Registrados")
     
     show_all = st.checkbox("Mostrar todas las columnas del archivo CSV", value=False)
     
     if show_all:
-        display_df = df_f.copy()
+        display_cols = list(df_f.columns)
     else:
-        display_cols = ["timestamp"] + numeric_cols_available
-        display_df = df_f[[c for c in display_cols if c in df_f.columns]].copy()
+        # Con varios sitios, la columna ``sitio`` distingue las filas de cada uno
+        site_cols = [SITE_COL] if len(sites) > 1 else []
+        display_cols = [
+            c for c in ["timestamp"] + site_cols + numeric_cols_available + [COVERAGE_COL] if c in df_f.columns
+        ]
+    
+    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
     
-    if "timestamp" in display_df.columns:
-        display_df["timestamp"] = display_df["timestamp"].dt.strftime("%d/%m/%Y %H:%M:%S")
+    with col_p1:
+        page_size = st.selectbox("Filas por página", [25, 50, 100, 250, 500], index=2)
+    
+    with col_p2:
+        sort_col = st.selectbox(
+            "Ordenar por",
+            ["timestamp"] + numeric_cols_available,
+            format_func=lambda c: "Fecha y hora" if c == "timestamp" else c
+        )
     
-    st.dataframe(display_df, use_container_width=True, height=450)
+    with col_p3:
+        descending = st.toggle("Descendente", value=False)
+    
+    n_pages = page_count(len(df_f), page_size)
+    with col_p4:
+        page = st.number_input("Página", min_value=1, max_value=n_pages, value=1, step=1)
+    
+    with prof.stage("tabla", rows_in=len(df_f)) as stage:
+        order = None
+        if sort_col != "timestamp":
+            order = sorted_rows(df_f, view_key, sort_col, not descending)
+        
+        display_df = table_page(
+            df_f, int(page), page_size, order=order, columns=display_cols,
+            descending=descending and order is None
+        )
+        st.dataframe(display_df, use_container_width=True, height=450)
+        stage.rows_out = len(display_df)
+    st.caption(f"Página {int(page)} de {n_pages} · {len(df_f):,} registros")
     
     st.markdown("### ⬇️ Descarga de Datos")
     
     col_btn1, col_btn2, col_btn3 = st.columns(3)
     
     with col_btn1:
+        export_fmt = st.selectbox(
+            "Formato",
+            list(FORMATS),
+            format_func=lambda f: FORMATS[f][0],
+            label_visibility="collapsed"
+        )
+        _, ext, mime = FORMATS[export_fmt]
+        export_cols = tuple(df_f.columns)
         st.download_button(
-            label="📥 Descargar datos filtrados (CSV)",
-            data=df_f.to_csv(index=False).encode("utf-8"),
-            file_name=f"datos_calidad_aire_{start_date}_{end_date}.csv",
-            mime="text/csv",
+            label=f"📥 Descargar datos filtrados ({FORMATS[export_fmt][0]})",
+            # El fichero solo se genera al pulsar el botón
+            data=lambda: export_file(df_f, view_key, export_cols, export_fmt),
+            file_name=f"datos_calidad_aire_{start_date}_{end_date}{ext}",
+            mime=mime,
             use_container_width=True
         )
     
     with col_btn2:
         st.metric("Total de registros", f"{len(df_f):,}")
     
-    with col3:
+    with col_btn3:
         st.metric("Período de datos", f"{(end_ts - start_ts).days + 1} días")
 
+@st.fragment
+@profiled_view("correlaciones")
+def view_correlation(prof: Profiler):
+    st.markdown("### Correlaciones entre Canales")
+    
+    method = st.radio("Coeficiente", ["Pearson", "Spearman"], horizontal=True)
+    corr_cols = [c for c in SENSOR_COLS if c in df_range.columns]
+    
+    # Sobre las muestras del rango, independientemente del resample
+    with prof.stage("correlaciones", rows_in=len(df_range)):
+        matrix = channel_correlation(df_range, (data_key, start_ts, end_ts), tuple(corr_cols), method.lower())
+    st.plotly_chart(correlation_figure(matrix, f"Correlación de {method}"), use_container_width=True)
+    
+    st.markdown("### Densidad Conjunta de Dos Canales")
+    
+    col_x, col_y, col_b = st.columns(3)
+    with col_x:
+        x_col = st.selectbox(
+            "Eje X", corr_cols,
+            index=corr_cols.index("humedad_relativa_pct") if "humedad_relativa_pct" in corr_cols else 0
+        )
+    with col_y:
+        y_col = st.selectbox(
+            "Eje Y", corr_cols,
+            index=corr_cols.index("PM2_5_ug_m3") if "PM2_5_ug_m3" in corr_cols else len(corr_cols) - 1
+        )
+    with col_b:
+        bins = st.select_slider("Intervalos por eje", [20, 30, 40, 50, 75, 100], value=50)
+    
+    with prof.stage("densidad 2-D") as stage:
+        hist = pair_histograms(frames, (data_key, x_col, y_col, bins))
+        counts = pair_density(hist, (data_key, x_col, y_col, bins, start_ts, end_ts))
+        stage.rows_out = int(counts.sum())
+    st.plotly_chart(
+        density_figure(counts, hist.x_edges, hist.y_edges, x_col, y_col),
+        use_container_width=True
+    )
+    st.caption(
+        f"{int(counts.sum()):,} muestras con ambos canales válidos. Los valores fuera de "
+        "los percentiles 0.5-99.5 del histórico se acumulan en los intervalos de los extremos."
+    )
+
+# Solo se ejecuta la vista elegida. Cada vista es un fragmento: sus widgets
+# vuelven a ejecutar únicamente esa vista, no el script completo
+VIEWS = {
+    "📈 Parámetros Básicos": view_basic,
+    "🌫️ Partículas PM": view_pm,
+    "⏰ Perfil Horario": view_profile,
+    "📊 Estadísticas": view_stats,
+    "🔗 Correlaciones": view_correlation,
+    "🧾 Datos Crudos": view_table,
+}
+active_view = st.radio("Vista", list(VIEWS), horizontal=True, key="vista", label_visibility="collapsed")
+VIEWS[active_view]()
+
+# =====================================================
+# Perfilado de la ejecución
+# =====================================================
+if prof.enabled:
+    profile_panel(
+        prof, "⏱️ Perfilado de esta ejecución",
+        filas=n_rows, filas_vista=len(df_f), version=data_key, resample=resample
+    )
+prof.close()
+
 # =====================================================
 # Footer
 # =====================================================
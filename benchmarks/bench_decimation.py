@@ -0,0 +1,83 @@
+"""Benchmark de la reducción de series antes de Plotly.
+
+Construye las figuras de series temporales del dashboard (CO₂, temperatura,
+humedad y las cuatro PM) sin resample, con y sin reducción, y mide el tamaño
+del JSON que Streamlit envía al navegador y el tiempo de construir y
+serializar las figuras. El coste de dibujado en el navegador crece con el
+número de puntos, que también se indica.
+
+Uso::
+
+    python -m benchmarks.bench_decimation --repeat 20
+"""
+
+import argparse
+import time
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from calidad_aire.decimate import lttb_indices, minmax_indices
+from calidad_aire.query import epoch_ns
+from calidad_aire.schema import PM_COLS
+from calidad_aire.storage import load_measurements
+
+CSV_PATH = "data/mediciones_completas_etiquetadas.csv"
+CHART_PX = 1400
+CHART_PX_HALF = 700
+
+SERIES = [
+    ("CO2_ppm", CHART_PX),
+    ("temperatura_C", CHART_PX_HALF),
+    ("humedad_relativa_pct", CHART_PX_HALF),
+] + [(col, CHART_PX) for col in PM_COLS]
+
+
+def _tiled(df, repeat):
+    span = df["timestamp"].iloc[-1] - df["timestamp"].iloc[0] + pd.Timedelta(seconds=22)
+    parts = [df.assign(timestamp=df["timestamp"] + i * span) for i in range(repeat)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _figures(df, reduce):
+    epoch = epoch_ns(df)
+    figs = []
+    points = 0
+    for col, budget in SERIES:
+        x, y = df["timestamp"], df[col]
+        if reduce is not None:
+            idx = reduce(epoch, y.to_numpy(), budget)
+            x, y = x.iloc[idx], y.iloc[idx]
+        points += len(y)
+        fig = go.Figure(go.Scatter(x=x, y=y, mode="lines", fill="tozeroy"))
+        fig.update_xaxes(rangeslider=dict(visible=True))
+        figs.append(fig)
+    return figs, points
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="replicar los datos N veces en el tiempo")
+    args = parser.parse_args(argv)
+
+    df = _tiled(load_measurements(args.csv), args.repeat)
+    print(f"{len(df):,} filas, {len(SERIES)} series")
+    print(f"{'método':<8} {'puntos':>10} {'JSON (MiB)':>11} {'tiempo (s)':>11}")
+
+    methods = {
+        "ninguno": None,
+        "minmax": minmax_indices,
+        "lttb": lambda x, y, budget: lttb_indices(x, y, 2 * budget),
+    }
+    for name, reduce in methods.items():
+        t0 = time.perf_counter()
+        figs, points = _figures(df, reduce)
+        size = sum(len(fig.to_json()) for fig in figs)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:<8} {points:>10,} {size / 2**20:>11.2f} {elapsed:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Benchmark del pipeline del dashboard sobre datos sintéticos, sin navegador.
+
+Para cada tamaño genera (o reutiliza) un CSV sintético con
+``benchmarks.synthetic`` y mide las mismas etapas que ejecuta ``app.py``:
+
+- conversión del CSV al almacén columnar y carga desde el almacén;
+- filtro por fechas (últimos 30 días y rango completo);
+- pirámide de agregados y cada intervalo de resample;
+- perfil horario (desde la pirámide y desde las muestras, comprobado contra
+  ``groupby`` por hora), estadísticas descriptivas y medias móviles de la OMS;
+- construcción y serialización de las figuras de series temporales, con las
+  mismas funciones de ``calidad_aire.pipeline`` que usa la app.
+
+Cada etapa se repite ``--runs`` veces y se guarda el mejor tiempo. El informe
+es un JSON con el entorno y una fila por (tamaño, etapa); con ``--baseline``
+se compara con un informe anterior.
+
+Uso::
+
+    python -m benchmarks.bench_pipeline --sizes 10k,100k,1M
+    python -m benchmarks.bench_pipeline --sizes 1M --baseline logs/bench_pipeline.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import parse_rows, write_csv
+from calidad_aire import pipeline, storage
+from calidad_aire.compliance import ComplianceEngine
+from calidad_aire.gaps import GapIndex
+from calidad_aire.ingest import IncrementalLoader
+from calidad_aire.profile import hourly_profile
+from calidad_aire.query import time_slice
+from calidad_aire.rollup import RESAMPLE_SECONDS, build_pyramid
+from calidad_aire.schema import PM_COLS, SENSOR_COLS, TIMESTAMP_COL
+from calidad_aire.stats import describe
+
+DATA_DIR = "logs/bench_data"
+REPORT = "logs/bench_pipeline.json"
+
+
+def _best(fn, runs):
+    """Mejor tiempo de ``runs`` ejecuciones y el resultado de la última."""
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _figures(frames, gaps):
+    """Figuras de series como en la vista sin resample: mismas funciones que la app."""
+    figs = [pipeline.co2_chart_figure(frames, gaps)]
+    for col in pipeline.SERIES_STYLE:
+        figs.append(pipeline.series_chart_figure(frames, col, gaps))
+    figs.append(pipeline.pm_chart_figure(frames, PM_COLS, gaps))
+    for fig in figs:
+        fig.to_json()  # serialización que hace st.plotly_chart
+    return sum(len(trace.y) for fig in figs for trace in fig.data if trace.y is not None)
+
+
+def check_profile(df, columns, profile):
+    """Compara las medias y recuentos de «todos» con ``groupby`` por hora."""
+    hours = df[TIMESTAMP_COL].dt.tz_convert("UTC").dt.hour
+    grouped = df[columns].astype(np.float64).groupby(hours.to_numpy())
+    means = grouped.mean().reindex(range(24))
+    counts = grouped.count().reindex(range(24), fill_value=0)
+    for col in columns:
+        np.testing.assert_allclose(profile.loc["todos", (col, "mean")].to_numpy(), means[col].to_numpy(),
+                                   rtol=1e-9, err_msg=col)
+        np.testing.assert_array_equal(profile.loc["todos", (col, "count")].to_numpy(), counts[col].to_numpy(),
+                                      err_msg=col)
+
+
+def dataset_path(data_dir, rows, seed) -> Path:
+    """CSV sintético de ``rows`` filas; se genera solo si no existe."""
+    path = Path(data_dir) / f"sintetico_{rows}_s{seed}.csv"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        write_csv(path, rows, seed)
+        print(f"  generado {path} en {time.perf_counter() - t0:.1f} s")
+    return path
+
+
+def run_size(path, runs):
+    """Etapas del pipeline sobre ``path``: lista de (etapa, segundos, filas de salida)."""
+    results = []
+
+    def record(stage, seconds, rows_out=None):
+        results.append((stage, seconds, rows_out))
+        print(f"  {stage:<22} {seconds:>9.4f} s" + (f"  -> {rows_out:,}" if rows_out is not None else ""))
+
+    store = storage.store_path(path)
+    store.unlink(missing_ok=True)
+    t0 = time.perf_counter()
+    storage.convert(path)
+    record("convertir_csv", time.perf_counter() - t0)
+
+    seconds, df = _best(lambda: IncrementalLoader(path).refresh(), runs)
+    record("carga", seconds, len(df))
+
+    end = df[TIMESTAMP_COL].iloc[-1]
+    start = df[TIMESTAMP_COL].iloc[0]
+    recent = end - pd.Timedelta(days=30)
+    seconds, part = _best(lambda: time_slice(df, recent, end), runs)
+    record("filtro_30_dias", seconds, len(part))
+    seconds, part = _best(lambda: time_slice(df, start, end), runs)
+    record("filtro_completo", seconds, len(part))
+
+    seconds, pyramid = _best(lambda: build_pyramid(df), runs)
+    record("piramide", seconds)
+    for label, step in RESAMPLE_SECONDS.items():
+        seconds, resampled = _best(lambda: pyramid.mean(step, start, end), runs)
+        record(f"resample_{label}", seconds, len(resampled))
+
+    columns = [c for c in SENSOR_COLS if c in df.columns]
+    tier = pyramid.tiers[3600]
+    seconds, _ = _best(lambda: hourly_profile(df, columns, tier=tier, start=start, end=end), runs)
+    record("perfil_horario", seconds)
+    # Sin nivel horario, como con varios sitios; solo días laborables, para
+    # que queden grupos vacíos al final
+    weekdays = df[(df[TIMESTAMP_COL].dt.tz_convert("UTC").dt.dayofweek < 5).to_numpy()]
+    seconds, profile = _best(lambda: hourly_profile(weekdays, columns), runs)
+    check_profile(weekdays, columns, profile)
+    record("perfil_horario_muestras", seconds)
+    seconds, _ = _best(lambda: describe(df, columns), runs)
+    record("estadisticas", seconds)
+    seconds, _ = _best(lambda: ComplianceEngine().update(df, 1), runs)
+    record("cumplimiento", seconds)
+    frames = {path.stem: df}
+    gaps = {path.stem: GapIndex.build(df)}
+    seconds, points = _best(lambda: _figures(frames, gaps), runs)
+    record("figuras", seconds, points)
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+    }
+
+
+def compare(report: dict, baseline_path) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["filas"], r["etapa"]): r["segundos"] for r in json.load(f)["resultados"]}
+    print(f"\nComparación con {baseline_path} (>1 = más rápido ahora)")
+    for r in report["resultados"]:
+        before = baseline.get((r["filas"], r["etapa"]))
+        if before and r["segundos"]:
+            print(f"  {r['filas']:>10,} {r['etapa']:<22} {before / r['segundos']:>7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k,1M",
+                        help="tamaños separados por comas (admite sufijos k y M)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", default=REPORT)
+    parser.add_argument("--baseline", help="informe JSON anterior con el que comparar")
+    args = parser.parse_args(argv)
+
+    report = {"entorno": environment(), "resultados": []}
+    for rows in (parse_rows(s) for s in args.sizes.split(",")):
+        print(f"{rows:,} filas")
+        path = dataset_path(args.data_dir, rows, args.seed)
+        for stage, seconds, rows_out in run_size(path, args.runs):
+            report["resultados"].append(
+                {"filas": rows, "etapa": stage, "segundos": seconds, "filas_salida": rows_out}
+            )
+
+    # Se lee la referencia antes de escribir por si es el mismo fichero
+    if args.baseline:
+        compare(report, args.baseline)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nInforme: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Memoria residente del dashboard con varias sesiones simultáneas.
+
+Cada sesión es un ``AppTest`` de Streamlit que ejecuta ``app.py`` en el mismo
+proceso, como las sesiones de un servidor: comparten el ``Dataset`` y las
+cachés de ``st.cache_resource``/``st.cache_data``. Las sesiones se mantienen
+vivas y cada una abre una vista y un intervalo de resample distintos, así que
+también se mide el estado derivado (figuras, tablas) que añade cada sesión.
+
+Cada número de sesiones se mide en un proceso nuevo. Se informa de la memoria
+residente tras la primera sesión (carga de datos incluida), tras la última y
+del incremento medio por sesión adicional, separando las páginas anónimas de
+las de fichero (las columnas proyectadas en memoria, ver
+``calidad_aire.ingest.ColumnBuffer``).
+
+Uso::
+
+    python -m benchmarks.bench_sessions --rows 1M --sessions 1,10,50
+    python -m benchmarks.bench_sessions --mmap-dir ""   # columnas en memoria anónima
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench_pipeline import DATA_DIR, dataset_path
+from benchmarks.synthetic import parse_rows
+from calidad_aire.dataset import MMAP_DIR
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+VIEWS = ("Básicos", "Partículas", "Perfil", "Estadísticas", "Correlaciones", "Datos")
+RESAMPLE = ("Sin resample", "30min", "1H", "2H", "6H", "1D")
+
+
+def _memory_mib() -> dict:
+    """RSS total, anónima y de fichero del proceso actual (MiB)."""
+    fields = dict(
+        line.split(":", 1) for line in Path("/proc/self/status").read_text().splitlines() if ":" in line
+    )
+    return {
+        key: int(fields[field].split()[0]) / 1024
+        for key, field in (("rss", "VmRSS"), ("anon", "RssAnon"), ("file", "RssFile"))
+    }
+
+
+def _session(index: int):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=600)
+    at.run()
+    at.sidebar.selectbox[0].set_value(RESAMPLE[index % len(RESAMPLE)]).run()
+    vista = at.radio(key="vista")
+    name = VIEWS[index % len(VIEWS)]
+    vista.set_value(next(o for o in vista.options if name in o)).run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def _child(sessions: int):
+    import pandas  # noqa: F401  (importar antes de medir)
+    import streamlit.testing.v1  # noqa: F401
+
+    before = _memory_mib()
+    t0 = time.perf_counter()
+    alive = [_session(0)]
+    first = _memory_mib()
+    alive += [_session(i) for i in range(1, sessions)]
+    last = _memory_mib()
+    print(json.dumps({
+        "sesiones": len(alive),
+        "segundos": time.perf_counter() - t0,
+        "primera": {k: first[k] - before[k] for k in first},
+        "total": {k: last[k] - before[k] for k in last},
+        "por_sesion": {k: (last[k] - first[k]) / max(sessions - 1, 1) for k in last},
+    }))
+
+
+def measure(csv_path, sessions: int, mmap_dir) -> dict:
+    env = dict(os.environ, CALIDAD_AIRE_DATA_GLOB=str(csv_path), CALIDAD_AIRE_MMAP_DIR=mmap_dir)
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_sessions", "--child", str(sessions)],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("1M"),
+                        help="filas del CSV sintético (admite sufijos k y M)")
+    parser.add_argument("--sessions", default="1,10,50", help="números de sesiones separados por comas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--mmap-dir", default=MMAP_DIR or "",
+                        help="directorio de las columnas proyectadas (vacío: memoria anónima)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return
+
+    path = dataset_path(args.data_dir, args.rows, args.seed).resolve()
+    print(f"{args.rows:,} filas, columnas en {args.mmap_dir or 'memoria anónima'}")
+    print(f"{'sesiones':>8} {'segundos':>9} {'RSS MiB':>9} {'anónima':>9} {'fichero':>9} "
+          f"{'1ª sesión':>10} {'por sesión':>11}")
+    for n in (int(s) for s in args.sessions.split(",")):
+        r = measure(path, n, args.mmap_dir)
+        total = r["total"]
+        print(f"{r['sesiones']:>8} {r['segundos']:>9.1f} {total['rss']:>9.1f} {total['anon']:>9.1f} "
+              f"{total['file']:>9.1f} {r['primera']['rss']:>10.1f} {r['por_sesion']['rss']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
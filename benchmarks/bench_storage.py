@@ -0,0 +1,139 @@
+"""Benchmark de carga en frío: CSV frente al almacén columnar.
+
+Cada medida se hace en un proceso nuevo para que la caché de Python y el
+allocator no favorezcan a ninguna de las dos rutas. Se informa del tiempo de
+carga y de la memoria residente (pico y final) que añade la carga.
+
+Uso::
+
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --repeat 50   # CSV replicado 50 veces
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CSV_PATH = "data/mediciones_completas_etiquetadas.csv"
+NUMERIC_COLS = ["temperatura_C", "humedad_relativa_pct", "CO2_ppm",
+                "PM1_ug_m3", "PM2_5_ug_m3", "PM4_ug_m3", "PM10_ug_m3"]
+
+
+def _rss_kib():
+    """Memoria residente actual y pico (KiB)."""
+    status = Path("/proc/self/status")
+    if status.exists():
+        fields = dict(
+            line.split(":", 1) for line in status.read_text().splitlines() if ":" in line
+        )
+        return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak, peak
+
+
+def _load_csv(path):
+    # Ruta original de app.py
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
+    df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def _load_store(path):
+    from calidad_aire.schema import DASHBOARD_COLS
+    from calidad_aire.storage import read_store, store_path
+
+    return read_store(store_path(path), columns=DASHBOARD_COLS)
+
+
+def _child(method, path):
+    import pandas  # noqa: F401  (importar antes de medir)
+    import pyarrow.parquet  # noqa: F401
+
+    rss0, _ = _rss_kib()
+    t0 = time.perf_counter()
+    df = {"csv": _load_csv, "store": _load_store}[method](path)
+    elapsed = time.perf_counter() - t0
+    rss1, peak = _rss_kib()
+    print(json.dumps({
+        "method": method,
+        "rows": len(df),
+        "seconds": elapsed,
+        "rss_mib": (rss1 - rss0) / 1024,
+        "peak_mib": (peak - rss0) / 1024,
+        "frame_mib": df.memory_usage(deep=True).sum() / 2**20,
+    }))
+
+
+def _replicate(src, dst, repeat):
+    """Replica el CSV desplazando las marcas de tiempo para simular más historia."""
+    import pandas as pd
+
+    df = pd.read_csv(src)
+    ts = pd.to_datetime(df["timestamp"], utc=True)
+    span = ts.max() - ts.min() + pd.Timedelta(seconds=22)
+    parts = []
+    for i in range(repeat):
+        part = df.copy()
+        part["timestamp"] = (ts + i * span).dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        part["id_medicion"] = df["id_medicion"] + i * len(df)
+        parts.append(part)
+    pd.concat(parts).to_csv(dst, index=False)
+
+
+def _run(method, path, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_storage", "--child", method, str(path)],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r["seconds"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="replicar el CSV N veces para simular más historia")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("METHOD", "PATH"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    from calidad_aire.storage import convert
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.csv)
+        if args.repeat > 1:
+            path = Path(tmp) / "mediciones.csv"
+            _replicate(args.csv, path, args.repeat)
+        store = convert(path)
+
+        print(f"CSV: {path.stat().st_size / 2**20:.1f} MiB  "
+              f"Parquet: {store.stat().st_size / 2**20:.1f} MiB")
+        print(f"{'ruta':<6} {'filas':>10} {'tiempo (s)':>11} {'RSS (MiB)':>10} "
+              f"{'pico (MiB)':>11} {'frame (MiB)':>12}")
+        for method in ("csv", "store"):
+            r = _run(method, path, args.runs)
+            print(f"{method:<6} {r['rows']:>10,} {r['seconds']:>11.3f} {r['rss_mib']:>10.1f} "
+                  f"{r['peak_mib']:>11.1f} {r['frame_mib']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Simulador del sistema de adquisición para probar el seguimiento en vivo.
+
+Genera mediciones sintéticas (``benchmarks.synthetic``) con marca de tiempo
+actual y las publica de dos formas, por separado o a la vez:
+
+- ``--port``: servidor TCP en localhost que envía a cada cliente conectado una
+  medición JSON por línea (la fuente ``tcp://127.0.0.1:PUERTO`` del dashboard);
+- ``--csv``: añade las filas al final de un CSV con el esquema de las
+  mediciones (se crea con cabecera si no existe).
+
+Con ``--rate`` se elige cuántas muestras por segundo se emiten (el sistema real
+emite una cada ~22 s; para ver el gráfico moverse conviene más).
+
+Uso::
+
+    python -m benchmarks.live_feed --port 8765 --rate 5
+    python -m benchmarks.live_feed --csv data/vivo.csv --rate 1
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import HEADER, sensor_block
+from calidad_aire.schema import ID_COL, SENSOR_COLS, TIMESTAMP_COL
+
+
+class Broadcaster:
+    """Servidor TCP que reenvía cada línea a todos los clientes conectados."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self._server = socket.create_server((host, port))
+        self._clients = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            conn, _ = self._server.accept()
+            with self._lock:
+                self._clients.append(conn)
+
+    def send(self, line: bytes) -> None:
+        with self._lock:
+            for conn in list(self._clients):
+                try:
+                    conn.sendall(line)
+                except OSError:
+                    self._clients.remove(conn)
+                    conn.close()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+
+def records(rng, next_id: int, n: int) -> list[dict]:
+    """``n`` mediciones con la hora actual e identificadores desde ``next_id``."""
+    now = time.time()
+    t_s = np.full(n, int(now))
+    block = sensor_block(rng, t_s)
+    stamp = pd.Timestamp(now, unit="s", tz="UTC").isoformat()
+    out = []
+    for i, row in enumerate(block.itertuples(index=False)):
+        rec = {TIMESTAMP_COL: stamp, ID_COL: next_id + i, "status": 0}
+        rec.update({col: (None if np.isnan(v) else round(float(v), 4)) for col, v in zip(SENSOR_COLS, row)})
+        out.append(rec)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, help="puerto TCP para NDJSON")
+    parser.add_argument("--csv", help="CSV al que añadir las filas")
+    parser.add_argument("--rate", type=float, default=1.0, help="muestras por segundo")
+    parser.add_argument("--count", type=int, default=0, help="muestras a emitir (0: sin fin)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.port is None and args.csv is None:
+        parser.error("indica --port, --csv o ambos")
+
+    rng = np.random.default_rng(args.seed)
+    server = Broadcaster(args.port) if args.port is not None else None
+    csv = Path(args.csv) if args.csv else None
+    if csv is not None and not csv.exists():
+        csv.write_text(",".join(HEADER) + "\n", encoding="utf-8")
+
+    sent = 0
+    next_id = 1
+    print(f"Emitiendo {args.rate:g} muestras/s" + (f" en tcp://127.0.0.1:{args.port}" if server else "")
+          + (f" y en {csv}" if csv else ""))
+    while not args.count or sent < args.count:
+        (rec,) = records(rng, next_id, 1)
+        next_id += 1
+        if server is not None:
+            server.send((json.dumps(rec) + "\n").encode("utf-8"))
+        if csv is not None:
+            with open(csv, "a", encoding="utf-8") as f:
+                f.write(",".join("" if rec.get(c) is None else str(rec[c]) for c in HEADER) + "\n")
+        sent += 1
+        time.sleep(1.0 / args.rate)
+
+
+if __name__ == "__main__":
+    main()
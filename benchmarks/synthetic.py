@@ -0,0 +1,142 @@
+"""Generador de mediciones sintéticas con el esquema de ``mediciones_completas_etiquetadas.csv``.
+
+Las series imitan a las reales:
+
+- una muestra cada ~22 s con algo de fluctuación, e identificadores
+  consecutivos que siguen avanzando durante los cortes;
+- cortes de adquisición aleatorios (de minutos a horas);
+- CO₂ con ciclo diario de ocupación (sube en horario laboral, cae de noche
+  y en fin de semana);
+- temperatura con ciclo diario y humedad anticorrelacionada;
+- PM1 ≤ PM2.5 ≤ PM4 ≤ PM10 a partir de un mismo factor de fondo, así que los
+  cuatro canales están correlacionados;
+- algún valor ausente suelto en CO₂ y temperatura.
+
+Se escribe por bloques, así que 10 millones de filas no necesitan tenerlas
+todas en memoria. El resultado es reproducible con la misma semilla.
+
+Uso::
+
+    python -m benchmarks.synthetic --rows 1000000 --out /tmp/sintetico_1M.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from calidad_aire.schema import ID_COL, OPTIONAL_COLS, SENSOR_COLS, TIMESTAMP_COL
+
+HEADER = [TIMESTAMP_COL, ID_COL] + SENSOR_COLS + OPTIONAL_COLS
+START = "2025-01-06T00:00:00"
+STEP_S = 22
+BLOCK_ROWS = 1_000_000
+
+# Probabilidad de que empiece un corte tras cada muestra y su duración (s)
+GAP_RATE = 1 / 20_000
+GAP_RANGE_S = (300, 6 * 3600)
+MISSING_RATE = 0.005
+
+
+def _smooth_noise(rng, t_s, period_s, scale):
+    """Ruido suave: valores aleatorios cada ``period_s`` interpolados linealmente."""
+    knots = np.arange(t_s[0] // period_s, t_s[-1] // period_s + 2) * period_s
+    return np.interp(t_s, knots, rng.normal(0.0, scale, len(knots)))
+
+
+def _occupancy(t_s):
+    """Ocupación 0..1: laborables de 8 a 18 h (UTC) con rampas de una hora."""
+    hour = (t_s % 86400) / 3600
+    weekday = (t_s // 86400 + 3) % 7 < 5
+    ramp = np.clip(hour - 7, 0, 1) * np.clip(18 - hour, 0, 1)
+    return np.where(weekday, ramp, 0.0)
+
+
+def timestamps(rng, n, start=START):
+    """Segundos epoch y huecos de id de ``n`` muestras con cortes aleatorios."""
+    step = STEP_S + rng.normal(0.0, 0.8, n)
+    gaps = rng.random(n) < GAP_RATE
+    step[gaps] += rng.uniform(*GAP_RANGE_S, gaps.sum())
+    step[0] = 0.0
+    t_s = pd.Timestamp(start, tz="UTC").value // 1_000_000_000 + np.cumsum(step).astype(np.int64)
+    id_step = np.maximum(np.rint(step / STEP_S), 1).astype(np.int64)
+    id_step[0] = 0
+    return t_s, np.cumsum(id_step)
+
+
+def sensor_block(rng, t_s) -> pd.DataFrame:
+    """Canales de los sensores para las marcas de tiempo ``t_s``."""
+    n = len(t_s)
+    day = 2 * np.pi * (t_s % 86400) / 86400
+    occ = _occupancy(t_s)
+
+    co2 = 430 + 650 * occ * (1 + _smooth_noise(rng, t_s, 3 * 3600, 0.35)) \
+        + _smooth_noise(rng, t_s, 1800, 40) + rng.normal(0, 12, n)
+    temp = 19 + 1.2 * np.sin(day - 2.0) + 0.8 * occ \
+        + _smooth_noise(rng, t_s, 6 * 3600, 0.6) + rng.normal(0, 0.03, n)
+    hum = 74 - 3.5 * (temp - 19) + _smooth_noise(rng, t_s, 4 * 3600, 3) + rng.normal(0, 0.2, n)
+
+    # Factor de fondo común (lognormal) más la resuspensión por ocupación
+    background = np.exp(1.0 + _smooth_noise(rng, t_s, 2 * 3600, 0.5))
+    pm1 = background * (1 + 0.4 * occ) + np.abs(rng.normal(0, 0.3, n))
+    pm2_5 = pm1 * (1.35 + 0.1 * rng.random(n))
+    pm4 = pm2_5 * (1.2 + 0.1 * rng.random(n)) + 0.8 * occ
+    pm10 = pm4 * (1.05 + 0.1 * rng.random(n)) + 0.6 * occ
+
+    block = pd.DataFrame({
+        "temperatura_C": temp,
+        "humedad_relativa_pct": np.clip(hum, 20, 99),
+        "CO2_ppm": np.rint(np.maximum(co2, 380)),
+        "PM1_ug_m3": pm1,
+        "PM2_5_ug_m3": pm2_5,
+        "PM4_ug_m3": pm4,
+        "PM10_ug_m3": pm10,
+    })
+    for col in ("CO2_ppm", "temperatura_C"):
+        block.loc[rng.random(n) < MISSING_RATE, col] = np.nan
+    return block
+
+
+def write_csv(path, rows: int, seed: int = 0, start=START, block_rows: int = BLOCK_ROWS) -> Path:
+    """Escribe ``rows`` mediciones sintéticas en ``path``."""
+    rng = np.random.default_rng(seed)
+    t_s, ids = timestamps(rng, rows, start)
+    ids += 1
+    path = Path(path)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(HEADER) + "\n")
+        for lo in range(0, rows, block_rows):
+            hi = min(lo + block_rows, rows)
+            block = sensor_block(rng, t_s[lo:hi])
+            stamps = np.datetime_as_string(t_s[lo:hi].astype("datetime64[s]"), unit="s")
+            block.insert(0, TIMESTAMP_COL, np.char.add(stamps, "+00:00"))
+            block.insert(1, ID_COL, ids[lo:hi])
+            for col in OPTIONAL_COLS:
+                block[col] = np.nan
+            block.to_csv(f, index=False, header=False, float_format="%.6g")
+    return path
+
+
+def parse_rows(text: str) -> int:
+    """``10k``, ``2.5M`` o ``1000`` -> número de filas."""
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("100k"),
+                        help="número de filas (admite sufijos k y M)")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default=START)
+    args = parser.parse_args(argv)
+
+    path = write_csv(args.out, args.rows, args.seed, args.start)
+    print(f"{args.rows:,} filas -> {path} ({path.stat().st_size / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
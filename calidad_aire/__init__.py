@@ -0,0 +1,6 @@
+"""Utilidades de datos del dashboard de calidad del aire interior.
+
+El paquete no depende de Streamlit: ``app.py`` se encarga de la interfaz y de
+la caché, y aquí vive la carga, el almacenamiento y el procesado de las
+mediciones.
+"""
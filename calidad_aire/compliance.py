@@ -0,0 +1,189 @@
+"""Cumplimiento de las guías de calidad del aire con medias móviles por tiempo.
+
+Las guías de la OMS para PM2.5 y PM10 se refieren a la media de 24 horas, no a
+cada muestra. Para cada muestra se calcula la media de la ventana ``(t - w, t]``
+sobre las marcas de tiempo reales (que no son equiespaciadas):
+
+- sumas acumuladas de los valores válidos y de su recuento;
+- el inicio de cada ventana sale de un ``searchsorted`` de ``t - w`` sobre el
+  array ordenado, que es la versión vectorizada de los dos punteros;
+- la media de la ventana es una resta de dos sumas acumuladas.
+
+Todo es O(n) y ``ComplianceEngine`` solo calcula las filas nuevas cuando el
+conjunto de datos crece por el final. De las sumas acumuladas solo guarda la
+cola que cubre la última ventana (unas pocas miles de filas); las medias van en
+un ``ColumnBuffer``, proyectado en memoria si se le da un directorio. Las
+medias de las ventanas que empiezan antes de la primera muestra (ventana
+incompleta) se dejan en NaN.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .ingest import ColumnBuffer
+from .query import epoch_ns, window_starts
+from .rollup import CHUNK_ROWS
+
+_NS_PER_S = 1_000_000_000
+
+# canal -> (ventana en segundos, límite). PM: guías OMS 2021 de 24 h.
+# CO₂: exposición media de 8 h frente al umbral de aire «elevado».
+GUIDELINES = {
+    "PM2_5_ug_m3": (24 * 3600, 15.0),
+    "PM10_ug_m3": (24 * 3600, 45.0),
+    "CO2_ppm": (8 * 3600, 1200.0),
+}
+
+EPISODE_COLUMNS = ["canal", "inicio", "fin", "duracion_h", "pico", "limite"]
+
+
+def _prefix(k: np.ndarray, old: np.ndarray, new: np.ndarray, lo: int, base: int = 0) -> np.ndarray:
+    """Acumulado de las filas ``[0, k)``: de las ``lo`` filas ya procesadas
+    (``old``, guardado desde la fila ``base``) o de las nuevas (``new``, que
+    empiezan en la fila ``lo``)."""
+    out = np.zeros(len(k), dtype=new.dtype)
+    if lo:
+        in_old = (k > 0) & (k <= lo)
+        out[in_old] = old[k[in_old] - 1 - base]
+    in_new = k > lo
+    out[in_new] = new[k[in_new] - 1 - lo]
+    return out
+
+
+def _window_means(epoch, values, window_s, first_ns, lo=0, tail=None):
+    """Medias de las ventanas de las filas ``lo..`` de ``epoch``.
+
+    ``tail`` es ``(base, suma, recuento)``: los acumulados de las filas ya
+    procesadas desde la fila ``base``, lo justo para las ventanas que aún
+    pueden empezar ahí. Devuelve las medias y el ``tail`` de después.
+    """
+    window_ns = window_s * _NS_PER_S
+    valid = ~np.isnan(values)
+    base, old_sum, old_count = tail if lo else (0, np.zeros(0), np.zeros(0, dtype=np.int64))
+    csum = (old_sum[-1] if lo else 0.0) + np.cumsum(np.where(valid, values, 0.0))
+    ccount = (old_count[-1] if lo else 0) + np.cumsum(valid)
+
+    starts = window_starts(epoch, window_ns, lo)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (csum - _prefix(starts, old_sum, csum, lo, base)) / (ccount - _prefix(starts, old_count, ccount, lo, base))
+    mean[epoch[lo:] < first_ns + window_ns] = np.nan
+
+    # Las ventanas de las filas futuras empiezan como pronto donde la última
+    keep = max(int(starts[-1]) - 1, 0) if len(starts) else base
+    if keep >= lo:
+        tail = (keep, csum[keep - lo:].copy(), ccount[keep - lo:].copy())
+    else:
+        tail = (keep, np.r_[old_sum[keep - base:], csum], np.r_[old_count[keep - base:], ccount])
+    return mean, tail
+
+
+def rolling_mean(epoch: np.ndarray, values: np.ndarray, window_s: int) -> np.ndarray:
+    """Media móvil por tiempo de ``values`` (NaN ignorados) sobre ``epoch`` en ns."""
+    if not len(epoch):
+        return np.zeros(0)
+    return _window_means(epoch, values.astype(np.float64), window_s, int(epoch[0]))[0]
+
+
+def episodes(epoch: np.ndarray, mean: np.ndarray, limit: float) -> pd.DataFrame:
+    """Tramos consecutivos con la media por encima de ``limit``.
+
+    Devuelve inicio, fin (primera y última muestra del tramo), duración en
+    horas y pico de la media de cada tramo.
+    """
+    above = np.nan_to_num(mean, nan=-np.inf) > limit
+    edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1) - 1
+    if len(first):
+        peak = np.maximum.reduceat(np.where(above, mean, -np.inf), first)
+    else:
+        peak = np.zeros(0)
+    start_ns, end_ns = epoch[first], epoch[last]
+    return pd.DataFrame({
+        "inicio": pd.DatetimeIndex(start_ns.view("datetime64[ns]")).tz_localize("UTC"),
+        "fin": pd.DatetimeIndex(end_ns.view("datetime64[ns]")).tz_localize("UTC"),
+        "duracion_h": (end_ns - start_ns) / (3600 * _NS_PER_S),
+        "pico": peak,
+    })
+
+
+def exceedances(df: pd.DataFrame, rolling: pd.DataFrame, i: int = 0, j: int | None = None) -> pd.DataFrame:
+    """Episodios de todos los canales de ``rolling`` en las filas ``[i, j)``."""
+    epoch = epoch_ns(df)[i:j]
+    parts = []
+    for col in rolling.columns:
+        found = episodes(epoch, rolling[col].to_numpy()[i:j], GUIDELINES[col][1])
+        found.insert(0, "canal", col)
+        found["limite"] = GUIDELINES[col][1]
+        parts.append(found)
+    if not parts:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[EPISODE_COLUMNS]
+
+
+class ComplianceEngine:
+    """Medias móviles de ``GUIDELINES`` alineadas con las filas de un DataFrame.
+
+    ``update(df, generation)`` solo procesa las filas añadidas desde la última
+    llamada mientras la generación de los datos no cambie (las filas anteriores
+    siguen siendo un prefijo); si cambia, recalcula todo, por bloques de
+    ``CHUNK_ROWS`` filas. Con ``directory`` las medias se guardan en ficheros
+    proyectados en memoria (ver ``ColumnBuffer``).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.generation = None
+        self.channels = []
+        self._buffer = None
+        self._tails = {}
+        self._first_ns = None
+        self._lock = threading.Lock()
+
+    @property
+    def n(self) -> int:
+        return self._buffer.n if self._buffer else 0
+
+    def update(self, df: pd.DataFrame, generation) -> pd.DataFrame:
+        """Medias móviles (una columna por canal) de todas las filas de ``df``."""
+        with self._lock:
+            channels = [c for c in GUIDELINES if c in df.columns]
+            if (
+                self._buffer is None
+                or generation != self.generation
+                or channels != self.channels
+                or len(df) < self.n
+                or not self.n
+            ):
+                self.generation = generation
+                self.channels = channels
+                self._buffer = None
+            epoch = epoch_ns(df)
+            for lo in range(self.n, len(df), CHUNK_ROWS):
+                block = self._block(df, epoch, lo, min(lo + CHUNK_ROWS, len(df)))
+                if self._buffer is None:
+                    self._buffer = ColumnBuffer(block, self.directory)
+                else:
+                    self._buffer.append(block)
+            if self._buffer is None:
+                self._buffer = ColumnBuffer(self._block(df, epoch, 0, 0), self.directory)
+            return self._buffer.frame()
+
+    def _block(self, df: pd.DataFrame, epoch: np.ndarray, lo: int, hi: int) -> pd.DataFrame:
+        """Medias de las filas ``[lo, hi)`` de ``df``."""
+        if not lo:
+            self._first_ns = int(epoch[0]) if len(epoch) else 0
+            self._tails = {}
+        block = {}
+        for col in self.channels:
+            block[col], self._tails[col] = _window_means(
+                epoch[:hi],
+                df[col].iloc[lo:hi].to_numpy(dtype=np.float64),
+                GUIDELINES[col][0],
+                self._first_ns,
+                lo,
+                self._tails.get(col),
+            )
+        return pd.DataFrame(block)
@@ -0,0 +1,137 @@
+"""Correlaciones entre canales e histogramas 2-D de densidad.
+
+Un diagrama de dispersión con todas las muestras no escala, así que la
+relación entre dos canales se muestra como un histograma 2-D. Para que
+cambiar el rango de fechas no obligue a recorrer otra vez las muestras:
+
+- los bordes de los intervalos de cada canal son fijos para una versión de
+  los datos (percentiles 0.5 y 99.5 de todo el histórico; los valores de
+  fuera caen en los intervalos de los extremos);
+- ``DailyHistograms`` cuenta las muestras por día UTC e intervalo ``(x, y)``,
+  con un ``np.bincount`` por semana sobre la clave ``(día, intervalo x,
+  intervalo y)``;
+- de cada semana guarda la suma acumulada (int32) y de cada día solo las
+  celdas no vacías: el histograma de un rango es una resta de dos semanas
+  más las celdas de los días sueltos de los extremos.
+
+La memoria crece con las semanas y con las celdas ocupadas, no con
+``días × intervalos²``: con 10 M de filas (~7 años) y 100 intervalos son
+unos 15 MB de sumas semanales frente a los ~200 MB de un array denso por día.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .query import epoch_ns
+from .stats import quantiles
+
+_NS_PER_DAY = 86_400 * 1_000_000_000
+EDGE_QUANTILES = (0.005, 0.995)
+WEEK_DAYS = 7
+
+
+def correlation_matrix(df: pd.DataFrame, columns, method: str = "pearson") -> pd.DataFrame:
+    """Matriz de correlación (``pearson`` o ``spearman``) con pares completos."""
+    return df[list(columns)].astype(np.float64).corr(method=method)
+
+
+def bin_edges(values: np.ndarray, bins: int) -> np.ndarray:
+    """``bins + 1`` bordes equiespaciados entre los percentiles de ``EDGE_QUANTILES``."""
+    lo, hi = quantiles(values[~np.isnan(values)], EDGE_QUANTILES)
+    if not np.isfinite(lo):
+        lo, hi = 0.0, 1.0
+    if hi <= lo:
+        hi = lo + 1.0
+    return np.linspace(lo, hi, bins + 1)
+
+
+def _bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    bins = len(edges) - 1
+    pos = (values - edges[0]) * (bins / (edges[-1] - edges[0]))
+    return np.clip(pos, 0, bins - 1).astype(np.int64)
+
+
+class DailyHistograms:
+    """Histogramas 2-D de un par de canales por día UTC.
+
+    ``first_day`` es el índice (días desde epoch) del primer día; las semanas
+    son bloques de ``WEEK_DAYS`` días desde él. ``week_totals[w]`` es el
+    histograma acumulado ``(bins_x, bins_y)`` de las ``w`` primeras semanas, y
+    ``cell_day``/``cell_bin``/``cell_count`` las celdas no vacías de cada día,
+    ordenadas por día.
+    """
+
+    def __init__(self, first_day, n_days, week_totals, cell_day, cell_bin, cell_count, x_edges, y_edges):
+        self.first_day = first_day
+        self.n_days = n_days
+        self.week_totals = week_totals
+        self.cell_day = cell_day
+        self.cell_bin = cell_bin
+        self.cell_count = cell_count
+        self.x_edges = x_edges
+        self.y_edges = y_edges
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.x_edges) - 1, len(self.y_edges) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.week_totals, self.cell_day, self.cell_bin, self.cell_count))
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, x_col: str, y_col: str, bins: int) -> "DailyHistograms":
+        x = df[x_col].to_numpy(dtype=np.float64)
+        y = df[y_col].to_numpy(dtype=np.float64)
+        x_edges, y_edges = bin_edges(x, bins), bin_edges(y, bins)
+        cells = bins * bins
+
+        valid = ~(np.isnan(x) | np.isnan(y))
+        days = epoch_ns(df)[valid] // _NS_PER_DAY
+        first = int(days[0]) if len(days) else 0
+        n_days = int(days[-1]) - first + 1 if len(days) else 0
+        days -= first
+        key = days * cells + _bin_index(x[valid], x_edges) * bins + _bin_index(y[valid], y_edges)
+
+        # Un bincount denso por semana (7 × intervalos²), nunca por todo el histórico
+        n_weeks = -(-n_days // WEEK_DAYS)
+        week_totals = np.zeros((n_weeks + 1, cells), dtype=np.int32)
+        bounds = np.searchsorted(days, np.arange(n_weeks + 1) * WEEK_DAYS)
+        cell_day, cell_bin, cell_count = [], [], []
+        for w in range(n_weeks):
+            week_key = key[bounds[w]:bounds[w + 1]] - w * WEEK_DAYS * cells
+            counts = np.bincount(week_key, minlength=WEEK_DAYS * cells).reshape(WEEK_DAYS, cells)
+            week_totals[w + 1] = week_totals[w] + counts.sum(axis=0)
+            day, cell = np.nonzero(counts)
+            cell_day.append((day + w * WEEK_DAYS).astype(np.int32))
+            cell_bin.append(cell.astype(np.int32))
+            cell_count.append(counts[day, cell].astype(np.int32))
+
+        def joined(parts):
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+        return cls(
+            first, n_days, week_totals.reshape(n_weeks + 1, bins, bins),
+            joined(cell_day), joined(cell_bin), joined(cell_count), x_edges, y_edges
+        )
+
+    def _day_counts(self, d0: int, d1: int) -> np.ndarray:
+        """Suma de las celdas de los días ``[d0, d1)``."""
+        i, j = np.searchsorted(self.cell_day, [d0, d1])
+        cells = self.shape[0] * self.shape[1]
+        counts = np.bincount(self.cell_bin[i:j], weights=self.cell_count[i:j], minlength=cells)
+        return counts.astype(np.int64).reshape(self.shape)
+
+    def range_counts(self, start, end) -> np.ndarray:
+        """Histograma ``(bins_x, bins_y)`` de los días que tocan ``[start, end]``."""
+        d0 = pd.Timestamp(start).value // _NS_PER_DAY - self.first_day
+        d1 = pd.Timestamp(end).value // _NS_PER_DAY - self.first_day + 1
+        d0, d1 = max(d0, 0), min(max(d1, 0), self.n_days)
+        if d1 <= d0:
+            return np.zeros(self.shape, dtype=np.int64)
+        # Semanas completas dentro del rango: una resta de sumas acumuladas
+        w0, w1 = -(-d0 // WEEK_DAYS), d1 // WEEK_DAYS
+        if w1 <= w0:
+            return self._day_counts(d0, d1)
+        whole = self.week_totals[w1].astype(np.int64) - self.week_totals[w0]
+        return whole + self._day_counts(d0, w0 * WEEK_DAYS) + self._day_counts(w1 * WEEK_DAYS, d1)
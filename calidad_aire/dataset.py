@@ -0,0 +1,171 @@
+"""Conjunto de datos formado por varios ficheros de mediciones (uno por nodo).
+
+Cada nodo de adquisición (sala, edificio) escribe su propio CSV con el mismo
+esquema. ``Dataset`` localiza todos los ficheros que casan con un patrón
+(``data/*.csv`` por defecto, configurable con ``CALIDAD_AIRE_DATA_GLOB``) y
+mantiene un ``IncrementalLoader`` por fichero; el nombre del fichero
+identifica el sitio.
+
+- El parseo de los CSV que no tienen un almacén columnar reutilizable se
+  reparte en un pool de procesos; después cada fichero se carga con su
+  ``IncrementalLoader`` (lectura Parquet, en hilos).
+- ``refresh()`` devuelve ``{sitio: DataFrame}``: las columnas de cada
+  cargador, ya ordenadas por tiempo, sin copiarlas. Los cálculos por sitio
+  (pirámide, cortes, medias móviles) trabajan sobre esas vistas.
+- Para comparar varios sitios solo se combina el rango elegido
+  (``calidad_aire.pipeline.combine_sites``), con una mezcla de k tramos
+  ordenados (``merge_order``), no con una ordenación global.
+
+Un ``Dataset`` está pensado para compartirse entre todas las sesiones de un
+proceso: hay una única copia de las columnas, la de los cargadores, y las
+sesiones reciben vistas de solo lectura sobre ella.
+
+Por defecto las columnas están en ficheros proyectados en memoria en
+``MMAP_DIR`` (``CALIDAD_AIRE_MMAP_DIR``; vacío para usar memoria anónima).
+El valor por defecto es ``/var/tmp``, que suele estar en disco: en un tmpfs
+como el ``/tmp`` de muchas distribuciones las páginas no se pueden descartar
+y acaban en swap igual que la memoria anónima.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from glob import glob
+from pathlib import Path
+
+import numpy as np
+
+from . import storage
+from .ingest import IncrementalLoader
+from .schema import DASHBOARD_COLS
+
+DATA_GLOB = os.environ.get("CALIDAD_AIRE_DATA_GLOB", "data/*.csv")
+_DISK_TMP = "/var/tmp" if os.path.isdir("/var/tmp") else tempfile.gettempdir()
+MMAP_DIR = os.environ.get("CALIDAD_AIRE_MMAP_DIR", _DISK_TMP) or None
+
+
+def discover(pattern: str = DATA_GLOB) -> list[Path]:
+    """Ficheros de mediciones que casan con ``pattern``, en orden alfabético."""
+    return [Path(p) for p in sorted(glob(pattern, recursive=True))]
+
+
+def site_ids(paths) -> list[str]:
+    """Identificador de sitio de cada fichero: su nombre sin extensión.
+
+    Si dos ficheros se llaman igual (``sala_a/sensor.csv`` y
+    ``sala_b/sensor.csv`` con un patrón recursivo), se usa la ruta relativa a
+    la carpeta común, sin extensión: ``sala_a/sensor`` y ``sala_b/sensor``.
+    """
+    paths = [Path(p) for p in paths]
+    stems = [p.stem for p in paths]
+    if len(set(stems)) == len(stems):
+        return stems
+    resolved = [p.resolve() for p in paths]
+    root = os.path.commonpath([str(p.parent) for p in resolved])
+    return [p.with_suffix("").relative_to(root).as_posix() for p in resolved]
+
+
+def merge_order(keys: list[np.ndarray]) -> np.ndarray:
+    """Permutación que mezcla tramos ya ordenados.
+
+    ``keys`` son los arrays ordenados de cada tramo; el resultado indexa su
+    concatenación. Se mezclan por parejas (log k niveles) y, a igualdad de
+    clave, se respeta el orden de los tramos.
+    """
+    runs = []
+    offset = 0
+    for k in keys:
+        runs.append((k, np.arange(offset, offset + len(k))))
+        offset += len(k)
+    if not runs:
+        return np.zeros(0, dtype=np.int64)
+
+    while len(runs) > 1:
+        merged = []
+        for i in range(0, len(runs) - 1, 2):
+            (ka, ia), (kb, ib) = runs[i], runs[i + 1]
+            pos_b = np.searchsorted(ka, kb, side="right") + np.arange(len(kb))
+            from_b = np.zeros(len(ka) + len(kb), dtype=bool)
+            from_b[pos_b] = True
+            k = np.empty(len(from_b), dtype=ka.dtype)
+            idx = np.empty(len(from_b), dtype=np.int64)
+            k[from_b], k[~from_b] = kb, ka
+            idx[from_b], idx[~from_b] = ib, ia
+            merged.append((k, idx))
+        if len(runs) % 2:
+            merged.append(runs[-1])
+        runs = merged
+    return runs[0][1]
+
+
+def _convert_quietly(path) -> None:
+    try:
+        storage.convert(path)
+    except OSError:
+        # Sin permisos de escritura: el cargador leerá el CSV directamente
+        pass
+
+
+def prepare_stores(paths, max_workers=None) -> None:
+    """Convierte en paralelo los CSV sin almacén columnar reutilizable."""
+    stale = [
+        p for p in paths
+        if not storage.covers_prefix(p, storage.read_metadata(storage.store_path(p)))
+    ]
+    if len(stale) < 2:
+        return  # con un solo fichero no compensa arrancar procesos
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            list(pool.map(_convert_quietly, stale))
+    except BrokenProcessPool:
+        # Sin procesos disponibles: cada cargador convertirá su fichero
+        pass
+
+
+class Dataset:
+    """Mediciones de varios ficheros, un cargador por sitio.
+
+    ``versions`` da la versión de cada sitio (``IncrementalLoader.version``);
+    las cachés por sitio usan la suya, así que las filas nuevas de un sitio
+    no invalidan las de los demás. ``gaps`` da el índice de cortes de cada
+    sitio.
+    """
+
+    def __init__(self, paths, columns=DASHBOARD_COLS, max_workers=None, mmap_dir=MMAP_DIR):
+        self.paths = [Path(p) for p in paths]
+        self.sites = site_ids(self.paths)
+        self.columns = list(columns)
+        self.max_workers = max_workers
+        self.mmap_dir = mmap_dir
+        self._loaders = None
+        self._lock = threading.Lock()
+
+    @property
+    def versions(self) -> dict:
+        if self._loaders is None:
+            return {}
+        return {site: loader.version for site, loader in zip(self.sites, self._loaders)}
+
+    @property
+    def gaps(self) -> dict:
+        """``GapIndex`` de cada sitio, que su cargador mantiene al ingerir."""
+        if self._loaders is None:
+            return {}
+        return {site: loader.gaps for site, loader in zip(self.sites, self._loaders)}
+
+    def refresh(self) -> dict:
+        """Incorpora las filas nuevas de cada fichero; devuelve ``{sitio: DataFrame}``."""
+        with self._lock:
+            if self._loaders is None:
+                prepare_stores(self.paths, self.max_workers)
+                self._loaders = [IncrementalLoader(p, self.columns, mmap_dir=self.mmap_dir) for p in self.paths]
+            if len(self._loaders) == 1:
+                frames = [self._loaders[0].refresh()]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    frames = list(pool.map(IncrementalLoader.refresh, self._loaders))
+            return dict(zip(self.sites, frames))
@@ -0,0 +1,85 @@
+"""Reducción de series temporales antes de enviarlas a Plotly.
+
+Un gráfico no puede mostrar más detalle que columnas de píxeles tiene, así que
+cada serie se reduce a un presupuesto de puntos ligado al ancho del gráfico.
+Los dos métodos conservan la forma de la serie (picos de CO₂, picos de PM):
+
+- ``minmax_indices``: divide el eje de tiempo en tantos cubos como columnas y
+  conserva el mínimo y el máximo de cada uno. Totalmente vectorizado.
+- ``lttb_indices``: Largest-Triangle-Three-Buckets; un punto por cubo, el que
+  forma el triángulo de mayor área con sus vecinos.
+
+Ambos devuelven índices ordenados sobre la serie original, incluidos el primer
+y el último punto.
+"""
+
+import numpy as np
+
+from .rollup import segment_starts
+
+
+def _bucket_of(x: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Cubo de tiempo (0..n_buckets-1) de cada muestra, con ``x`` ordenado."""
+    span = float(x[-1] - x[0]) or 1.0
+    pos = (x - x[0]).astype(np.float64) * (n_buckets / span)
+    return np.minimum(pos.astype(np.int64), n_buckets - 1)
+
+
+def _first_per_segment(hits: np.ndarray, segment: np.ndarray) -> np.ndarray:
+    return hits[segment_starts(segment[hits])]
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Índices del mínimo y el máximo de cada cubo de tiempo.
+
+    Los cubos sin ningún valor válido conservan una muestra NaN, de modo que
+    los huecos de la serie siguen cortando la línea en el gráfico.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    starts = segment_starts(_bucket_of(x, n_buckets))
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+
+    nan = np.isnan(y)
+    lo = np.where(nan, np.inf, y)
+    hi = np.where(nan, -np.inf, y)
+    seg_min = np.minimum.reduceat(lo, starts)
+    seg_max = np.maximum.reduceat(hi, starts)
+
+    idx_min = _first_per_segment(np.flatnonzero(lo == seg_min[segment]), segment)
+    idx_max = _first_per_segment(np.flatnonzero(hi == seg_max[segment]), segment)
+    return np.unique(np.concatenate([idx_min, idx_max, [0, n - 1]]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices elegidos por LTTB (``n_out`` puntos como máximo).
+
+    Las muestras NaN no participan en la selección.
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n <= n_out or n_out < 3:
+        return valid
+
+    xs = (x[valid] - x[valid[0]]).astype(np.float64)
+    ys = y[valid].astype(np.float64)
+
+    # Cubos de igual número de puntos para todo salvo el primero y el último
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    nxt_x = np.add.reduceat(xs[1 : n - 1], edges[:-1] - 1) / np.diff(edges)
+    nxt_y = np.add.reduceat(ys[1 : n - 1], edges[:-1] - 1) / np.diff(edges)
+    nxt_x = np.r_[nxt_x[1:], xs[-1]]
+    nxt_y = np.r_[nxt_y[1:], ys[-1]]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        bx, by = xs[lo:hi], ys[lo:hi]
+        area = np.abs((xs[a] - nxt_x[k]) * (by - ys[a]) - (xs[a] - bx) * (nxt_y[k] - ys[a]))
+        a = lo + int(np.argmax(area))
+        out[k + 1] = a
+    return valid[out]
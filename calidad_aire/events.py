@@ -0,0 +1,157 @@
+"""Detección de eventos sobre las series ordenadas por tiempo.
+
+Cada muestra recibe como mucho una etiqueta en la columna categórica
+``Evento`` (NaN si no hay evento):
+
+- ``ventilación``: caída brusca de CO₂ acompañada de un escalón de
+  temperatura o de humedad (apertura de ventanas);
+- ``ocupación``: subida sostenida de CO₂;
+- ``pico PM``: PM2.5 muy por encima de su media de la última hora (cocina,
+  limpieza, humo).
+
+Las derivadas son diferencias sobre ventanas de tiempo ``(t - w, t]``, no de
+filas, porque el muestreo no es regular; el inicio de cada ventana sale de un
+``searchsorted`` sobre las marcas ordenadas. Todo es lineal y ``label_tail``
+solo etiqueta las filas nuevas, usando como contexto las muestras previas que
+caben en la ventana más larga.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .query import epoch_ns, window_starts
+from .schema import EVENT_COL
+
+EVENTS = ("ventilación", "ocupación", "pico PM")
+EVENT_DTYPE = pd.CategoricalDtype(list(EVENTS))
+
+_NS_PER_MIN = 60 * 1_000_000_000
+
+# Umbrales (ventanas en minutos)
+VENT_WINDOW_MIN = 5
+VENT_CO2_DROP = 100.0  # ppm en la ventana
+VENT_TEMP_DROP = 0.3  # °C
+VENT_HUM_STEP = 2.0  # puntos de humedad relativa, en cualquier sentido
+
+OCC_WINDOW_MIN = 15
+OCC_CO2_RISE = 60.0  # ppm en la ventana (~4 ppm/min sostenidos)
+
+PM_COL = "PM2_5_ug_m3"
+PM_BASELINE_MIN = 60
+PM_EXCESS = 10.0  # µg/m³ sobre la media de la última hora
+PM_RATIO = 2.0
+
+# Separación máxima entre muestras etiquetadas de un mismo evento
+MERGE_GAP_MIN = 10
+
+LOOKBACK_MIN = max(VENT_WINDOW_MIN, OCC_WINDOW_MIN, PM_BASELINE_MIN)
+
+
+def window_change(epoch: np.ndarray, values: np.ndarray, minutes: int, lo: int = 0) -> np.ndarray:
+    """``v(t) - v(t - w)`` de las filas ``lo..``; NaN si la ventana tiene un corte.
+
+    Se compara con la última muestra anterior a la ventana. Si esa muestra
+    está a menos de media ventana o a más de dos ventanas (corte de datos),
+    la diferencia no es comparable y se deja en NaN.
+    """
+    window_ns = minutes * _NS_PER_MIN
+    prev = np.maximum(window_starts(epoch, window_ns, lo) - 1, 0)
+    dt = epoch[lo:] - epoch[prev]
+    change = values[lo:] - values[prev]
+    change[(dt < window_ns // 2) | (dt > 2 * window_ns)] = np.nan
+    return change
+
+
+def trailing_mean(epoch: np.ndarray, values: np.ndarray, minutes: int, lo: int = 0) -> np.ndarray:
+    """Media de ``values`` (sin NaN) en la ventana ``(t - w, t]`` de las filas ``lo..``."""
+    valid = ~np.isnan(values)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    ccount = np.concatenate([[0], np.cumsum(valid)])
+    starts = window_starts(epoch, minutes * _NS_PER_MIN, lo)
+    ends = np.arange(lo + 1, len(epoch) + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (csum[ends] - csum[starts]) / (ccount[ends] - ccount[starts])
+
+
+def detect(df: pd.DataFrame, lo: int = 0) -> np.ndarray:
+    """Códigos de evento (``-1`` = ninguno) de las filas ``lo..`` de ``df``.
+
+    Las filas anteriores a ``lo`` solo se usan como contexto de las ventanas.
+    Si coinciden varias condiciones, manda la última de ``EVENTS``.
+    """
+    epoch = epoch_ns(df)
+    codes = np.full(len(df) - lo, -1, dtype=np.int8)
+
+    def col(name):
+        return df[name].to_numpy(dtype=np.float64) if name in df.columns else None
+
+    co2, temp, hum, pm = col("CO2_ppm"), col("temperatura_C"), col("humedad_relativa_pct"), col(PM_COL)
+
+    with np.errstate(invalid="ignore"):
+        if co2 is not None:
+            rise = window_change(epoch, co2, OCC_WINDOW_MIN, lo)
+            recent = window_change(epoch, co2, VENT_WINDOW_MIN, lo)
+            codes[(rise >= OCC_CO2_RISE) & (recent > 0)] = EVENTS.index("ocupación")
+
+            step = np.zeros(len(codes), dtype=bool)
+            if temp is not None:
+                step |= window_change(epoch, temp, VENT_WINDOW_MIN, lo) <= -VENT_TEMP_DROP
+            if hum is not None:
+                step |= np.abs(window_change(epoch, hum, VENT_WINDOW_MIN, lo)) >= VENT_HUM_STEP
+            codes[(recent <= -VENT_CO2_DROP) & step] = EVENTS.index("ventilación")
+
+        if pm is not None:
+            base = trailing_mean(epoch, pm, PM_BASELINE_MIN, lo)
+            level = pm[lo:]
+            codes[(level - base >= PM_EXCESS) & (level >= PM_RATIO * base)] = EVENTS.index("pico PM")
+    return codes
+
+
+def label(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade la columna ``Evento`` a todas las filas de ``df``."""
+    df[EVENT_COL] = pd.Categorical.from_codes(detect(df), dtype=EVENT_DTYPE)
+    return df
+
+
+def label_tail(history: pd.DataFrame, tail: pd.DataFrame) -> pd.DataFrame:
+    """Añade ``Evento`` a ``tail`` (filas nuevas posteriores a ``history``).
+
+    Solo se toman de ``history`` las muestras dentro de la ventana más larga
+    antes de la primera fila nueva.
+    """
+    if not len(tail):
+        tail[EVENT_COL] = pd.Categorical([], dtype=EVENT_DTYPE)
+        return tail
+    first = epoch_ns(tail)[0]
+    ctx = int(np.searchsorted(epoch_ns(history), first - LOOKBACK_MIN * _NS_PER_MIN, side="left"))
+    # Una muestra más como referencia de la ventana más larga
+    context = history.iloc[max(ctx - 1, 0):]
+    columns = [c for c in tail.columns if c != EVENT_COL]
+    window = pd.concat([context[columns], tail[columns]], ignore_index=True)
+    tail[EVENT_COL] = pd.Categorical.from_codes(detect(window, len(context)), dtype=EVENT_DTYPE)
+    return tail
+
+
+def onsets(df: pd.DataFrame, group_col: str | None = None) -> pd.DataFrame:
+    """Primera fila de cada evento.
+
+    Las filas con la misma etiqueta separadas menos de ``MERGE_GAP_MIN`` se
+    consideran un mismo evento (el ruido hace que las condiciones parpadeen).
+    Con ``group_col`` (p. ej. el sitio) cada grupo se trata por separado.
+    """
+    codes = df[EVENT_COL].cat.codes.to_numpy()
+    rows = np.flatnonzero(codes >= 0)
+    if group_col is not None and group_col in df.columns:
+        groups = df[group_col].cat.codes.to_numpy()[rows]
+        rows = rows[np.argsort(groups, kind="stable")]
+        groups = df[group_col].cat.codes.to_numpy()[rows]
+    else:
+        groups = np.zeros(len(rows), dtype=np.int8)
+    c, t = codes[rows], epoch_ns(df)[rows]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (
+        (c[1:] != c[:-1])
+        | (groups[1:] != groups[:-1])
+        | (t[1:] - t[:-1] > MERGE_GAP_MIN * _NS_PER_MIN)
+    )
+    return df.iloc[np.sort(rows[first])]
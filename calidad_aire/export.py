@@ -0,0 +1,51 @@
+"""Exportación de las mediciones filtradas.
+
+El fichero se genera por bloques de filas, directamente en un buffer binario:
+no se construye el CSV completo como ``str`` para luego copiarlo a ``bytes``.
+Además del CSV se puede exportar CSV comprimido con gzip y Parquet, mucho más
+pequeños para rangos largos.
+"""
+
+import gzip
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 50_000
+
+# formato -> (etiqueta, extensión, tipo MIME)
+FORMATS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "csv.gz": ("CSV comprimido (gzip)", ".csv.gz", "application/gzip"),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_csv_chunks(df, chunk_rows: int = CHUNK_ROWS):
+    """Genera el CSV de ``df`` en bloques de ``chunk_rows`` filas (bytes UTF-8)."""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start : start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def write_export(df, fmt: str, out, chunk_rows: int = CHUNK_ROWS) -> None:
+    """Escribe ``df`` en el fichero binario ``out`` con el formato ``fmt``."""
+    if fmt == "csv":
+        for block in iter_csv_chunks(df, chunk_rows):
+            out.write(block)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6, mtime=0) as gz:
+            for block in iter_csv_chunks(df, chunk_rows):
+                gz.write(block)
+    elif fmt == "parquet":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, out, compression="zstd", row_group_size=chunk_rows)
+    else:
+        raise ValueError(f"Formato de exportación desconocido: {fmt!r}")
+
+
+def export_bytes(df, fmt: str, chunk_rows: int = CHUNK_ROWS) -> bytes:
+    buf = io.BytesIO()
+    write_export(df, fmt, buf, chunk_rows)
+    return buf.getvalue()
@@ -0,0 +1,371 @@
+"""Construcción de las figuras Plotly del dashboard.
+
+Todas las figuras de series temporales se crean aquí para que compartan el
+estilo y el modo de dibujado. Por debajo de ``WEBGL_THRESHOLD`` puntos por
+figura se usa ``go.Scatter`` (SVG); por encima, ``go.Scattergl`` (WebGL), que
+sigue siendo fluido con cientos de miles de puntos. Las bandas de CO₂, las
+líneas de referencia de la OMS y el rangeslider se mantienen en ambos modos;
+la única diferencia visible es que Plotly no dibuja las trazas WebGL dentro de
+la miniatura del rangeslider (el zoom con él funciona igual).
+
+El umbral se puede cambiar con la variable de entorno
+``CALIDAD_AIRE_WEBGL_THRESHOLD`` (``0`` fuerza WebGL siempre).
+
+Las series temporales llegan como ``{nombre: (x, y)}``: una traza por sitio.
+Con una sola serie se dibuja con relleno; con varias, cada sitio lleva un
+color de ``SITE_COLORS`` (o, en PM, un trazo de ``SITE_DASHES``) sin relleno.
+"""
+
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from .compliance import GUIDELINES
+from .schema import EVENT_COL, TIMESTAMP_COL
+
+WEBGL_THRESHOLD = int(os.environ.get("CALIDAD_AIRE_WEBGL_THRESHOLD", "10000"))
+
+# Referencias de CO₂ (ppm) y límites OMS de 24 h (µg/m³); los límites vienen
+# de ``compliance.GUIDELINES``
+CO2_OPTIMAL = 800
+CO2_HIGH = int(GUIDELINES["CO2_ppm"][1])
+_PM25_24H = int(GUIDELINES["PM2_5_ug_m3"][1])
+_PM10_24H = int(GUIDELINES["PM10_ug_m3"][1])
+WHO_24H = {
+    "PM2_5_ug_m3": (_PM25_24H, "orange", f"OMS PM2.5 (24h): {_PM25_24H} µg/m³"),
+    "PM10_ug_m3": (_PM10_24H, "red", f"OMS PM10 (24h): {_PM10_24H} µg/m³"),
+}
+
+# Colores y trazos para distinguir sitios cuando se comparan varios
+SITE_COLORS = ["#667eea", "#ec4899", "#10b981", "#f59e0b", "#0ea5e9", "#8b5cf6", "#ef4444", "#64748b"]
+SITE_DASHES = ["solid", "dash", "dot", "dashdot", "longdash", "longdashdot"]
+
+# Evento -> (color, símbolo) de los marcadores
+EVENT_STYLE = {
+    "ventilación": ("#0ea5e9", "triangle-down"),
+    "ocupación": ("#8b5cf6", "triangle-up"),
+    "pico PM": ("#dc2626", "star"),
+}
+
+
+def use_webgl(n_points: int, threshold: int | None = None) -> bool:
+    threshold = WEBGL_THRESHOLD if threshold is None else threshold
+    return n_points > threshold
+
+
+def line_trace(x, y, webgl: bool = False, **kwargs):
+    """Traza de líneas SVG o WebGL con los mismos argumentos."""
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(x=x, y=y, **kwargs)
+
+
+def _points(series) -> int:
+    return sum(len(y) for _, y in series.values())
+
+
+def add_site_traces(fig, series: dict, webgl: bool, color, fillcolor, **kwargs) -> None:
+    """Una traza por entrada de ``series``; relleno solo si hay una."""
+    if len(series) == 1:
+        ((name, (x, y)),) = series.items()
+        fig.add_trace(line_trace(
+            x, y, webgl, mode='lines', name=name,
+            line=dict(color=color, width=2.5), fill='tozeroy', fillcolor=fillcolor, **kwargs
+        ))
+        return
+    for i, (name, (x, y)) in enumerate(series.items()):
+        fig.add_trace(line_trace(
+            x, y, webgl, mode='lines', name=name,
+            line=dict(color=SITE_COLORS[i % len(SITE_COLORS)], width=2), **kwargs
+        ))
+
+
+def add_event_markers(fig, onsets, y_col, kinds) -> None:
+    """Marca el inicio de los eventos ``kinds`` (filas de ``events.onsets``)."""
+    if onsets is None or y_col not in onsets.columns:
+        return
+    for kind in kinds:
+        rows = onsets[onsets[EVENT_COL] == kind]
+        if not len(rows):
+            continue
+        color, symbol = EVENT_STYLE[kind]
+        fig.add_trace(go.Scatter(
+            x=rows[TIMESTAMP_COL],
+            y=rows[y_col],
+            mode='markers',
+            name=kind.capitalize(),
+            marker=dict(color=color, symbol=symbol, size=11, line=dict(width=1, color='white'))
+        ))
+
+
+def co2_figure(series: dict, y_max, threshold=None, events=None) -> go.Figure:
+    """CO₂ con bandas óptimo/moderado/elevado y líneas de 800 y 1200 ppm.
+
+    ``series`` asocia cada nombre de traza (sitio) a sus arrays ``(x, y)``.
+    ``events`` (opcional): inicios de evento; se marcan ventilación y ocupación.
+    """
+    webgl = use_webgl(_points(series), threshold)
+    fig = go.Figure()
+
+    fig.add_hrect(y0=0, y1=CO2_OPTIMAL, fillcolor="green", opacity=0.08, line_width=0)
+    fig.add_hrect(y0=CO2_OPTIMAL, y1=CO2_HIGH, fillcolor="yellow", opacity=0.08, line_width=0)
+    fig.add_hrect(y0=CO2_HIGH, y1=y_max * 1.1, fillcolor="red", opacity=0.08, line_width=0)
+
+    add_site_traces(fig, series, webgl, '#667eea', 'rgba(102, 126, 234, 0.15)')
+
+    add_event_markers(fig, events, "CO2_ppm", ["ventilación", "ocupación"])
+
+    fig.add_hline(y=CO2_OPTIMAL, line_dash="dash", line_color="green", line_width=2)
+    fig.add_hline(y=CO2_HIGH, line_dash="dash", line_color="red", line_width=2)
+
+    fig.update_layout(
+        title="Concentración de CO₂",
+        xaxis_title="Fecha y hora",
+        yaxis_title="CO₂ (ppm)",
+        template='plotly_white',
+        height=500
+    )
+    fig.update_xaxes(rangeslider=dict(visible=True))
+    return fig
+
+
+def series_figure(series: dict, color, fillcolor, yaxis_title, threshold=None) -> go.Figure:
+    """Serie con relleno (temperatura, humedad); una traza por sitio de ``series``."""
+    webgl = use_webgl(_points(series), threshold)
+    fig = go.Figure()
+    add_site_traces(fig, series, webgl, color, fillcolor)
+    fig.update_layout(
+        xaxis_title="Fecha y hora",
+        yaxis_title=yaxis_title,
+        template='plotly_white',
+        height=400,
+        showlegend=len(series) > 1
+    )
+    fig.update_xaxes(rangeslider=dict(visible=True))
+    return fig
+
+
+def pm_figure(series: dict, labels: dict, colors: dict, threshold=None, episodes=None, events=None) -> go.Figure:
+    """Partículas PM; ``series`` asocia cada columna a sus arrays ``(x, y)``.
+
+    Para comparar sitios las claves son ``(columna, sitio)``: cada columna
+    conserva su color y cada sitio lleva un trazo distinto.
+
+    ``episodes`` (opcional) es una tabla de ``compliance.exceedances``: cada
+    episodio en que la media de 24 h supera la guía se sombrea con el color de
+    su línea de referencia. ``events`` (opcional): inicios de evento; se
+    marcan los picos de PM sobre la serie de PM2.5.
+    """
+    webgl = use_webgl(_points(series), threshold)
+    fig = go.Figure()
+
+    sites = list(dict.fromkeys(key[1] for key in series if isinstance(key, tuple)))
+    channels = set()
+    for key, (x, y) in series.items():
+        pm_col, site = key if isinstance(key, tuple) else (key, None)
+        channels.add(pm_col)
+        fig.add_trace(line_trace(
+            x, y, webgl,
+            mode='lines',
+            name=labels[pm_col] if site is None else f"{labels[pm_col]} · {site}",
+            line=dict(
+                color=colors[pm_col], width=2.5 if site is None else 2,
+                dash=None if site is None else SITE_DASHES[sites.index(site) % len(SITE_DASHES)]
+            )
+        ))
+
+    add_event_markers(fig, events, "PM2_5_ug_m3", ["pico PM"])
+
+    # Líneas de referencia OMS
+    for pm_col, (limit, color, text) in WHO_24H.items():
+        if pm_col in channels:
+            fig.add_hline(y=limit, line_dash="dash", line_color=color, annotation_text=text)
+
+    if episodes is not None:
+        for ep in episodes.itertuples():
+            if ep.canal in channels and ep.canal in WHO_24H:
+                fig.add_vrect(
+                    x0=ep.inicio, x1=ep.fin,
+                    fillcolor=WHO_24H[ep.canal][1], opacity=0.12, line_width=0
+                )
+
+    fig.update_layout(
+        title="Concentración de Partículas en Suspensión",
+        xaxis_title="Fecha y hora",
+        yaxis_title="Concentración (µg/m³)",
+        template='plotly_white',
+        height=550,
+        hovermode='x unified'
+    )
+    fig.update_xaxes(rangeslider=dict(visible=True))
+    return fig
+
+
+def profile_figure(hours, series: dict, yaxis_title, colors=None) -> go.Figure:
+    """Perfil por hora del día; ``series`` asocia cada nombre de traza a sus valores."""
+    fig = go.Figure()
+    for name, y in series.items():
+        line = dict(width=3)
+        if colors and name in colors:
+            line["color"] = colors[name]
+        fig.add_trace(go.Scatter(
+            x=hours,
+            y=y,
+            mode='lines+markers',
+            name=name,
+            line=line,
+            marker=dict(size=8)
+        ))
+    fig.update_layout(
+        xaxis_title="Hora del día",
+        yaxis_title=yaxis_title,
+        template='plotly_white',
+        height=400
+    )
+    return fig
+
+
+def box_figure(name, stats) -> go.Figure:
+    """Diagrama de caja a partir de estadísticas ya calculadas (``stats.describe``).
+
+    Solo se envían los cinco números de la caja, no las muestras.
+    """
+    fig = go.Figure(go.Box(
+        name=name,
+        q1=[stats["q1"]],
+        median=[stats["median"]],
+        q3=[stats["q3"]],
+        lowerfence=[stats["lowerfence"]],
+        upperfence=[stats["upperfence"]],
+    ))
+    fig.update_layout(
+        title=name,
+        height=350,
+        template='plotly_white',
+        showlegend=False
+    )
+    return fig
+
+
+def _rgba(hex_color: str, alpha: float) -> str:
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
+
+def profile_band_figure(hours, bands: dict, colors: dict, yaxis_title) -> go.Figure:
+    """Perfil horario con la media y la banda p10-p90 de cada grupo.
+
+    ``bands`` asocia cada nombre de grupo a un DataFrame con columnas
+    ``mean``, ``p10`` y ``p90`` (ver ``profile.hourly_profile``).
+    """
+    fig = go.Figure()
+    for name, stats in bands.items():
+        color = colors[name]
+        fig.add_trace(go.Scatter(
+            x=hours, y=stats["p90"], mode='lines', line=dict(width=0),
+            hoverinfo='skip', showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=hours, y=stats["p10"], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=_rgba(color, 0.15),
+            name=f"{name} (p10-p90)"
+        ))
+        fig.add_trace(go.Scatter(
+            x=hours,
+            y=stats["mean"],
+            mode='lines+markers',
+            name=name,
+            line=dict(color=color, width=3),
+            marker=dict(size=8)
+        ))
+    fig.update_layout(
+        xaxis_title="Hora del día",
+        yaxis_title=yaxis_title,
+        template='plotly_white',
+        height=400
+    )
+    return fig
+
+
+def correlation_figure(matrix, title) -> go.Figure:
+    """Matriz de correlación con el coeficiente escrito en cada celda."""
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=list(matrix.columns),
+        y=list(matrix.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu_r',
+        text=matrix.round(2).to_numpy(),
+        texttemplate="%{text}",
+        hovertemplate="%{y} / %{x}: %{z:.3f}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=title,
+        template='plotly_white',
+        height=550,
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
+
+
+def density_figure(counts, x_edges, y_edges, x_title, y_title) -> go.Figure:
+    """Histograma 2-D ``counts[bins_x, bins_y]`` como mapa de densidad.
+
+    El color va en escala logarítmica para que las zonas poco pobladas sigan
+    viéndose junto al núcleo de la distribución.
+    """
+    x_mid = (x_edges[:-1] + x_edges[1:]) / 2
+    y_mid = (y_edges[:-1] + y_edges[1:]) / 2
+    z = np.where(counts > 0, np.log10(np.maximum(counts, 1)), np.nan).T
+    fig = go.Figure(go.Heatmap(
+        x=x_mid,
+        y=y_mid,
+        z=z,
+        customdata=counts.T,
+        colorscale='Viridis',
+        colorbar=dict(title="muestras", tickprefix="10^"),
+        hovertemplate=f"{x_title}: %{{x:.2f}}<br>{y_title}: %{{y:.2f}}<br>muestras: %{{customdata}}<extra></extra>"
+    ))
+    fig.update_layout(
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        template='plotly_white',
+        height=550
+    )
+    return fig
+
+
+def live_figure(channels: dict) -> go.Figure:
+    """Figura vacía del seguimiento en vivo: una fila por canal con eje x común.
+
+    ``channels`` asocia cada columna a ``(etiqueta, color)``. Las muestras se
+    añaden después con ``extend_live_figure``.
+    """
+    fig = make_subplots(rows=len(channels), cols=1, shared_xaxes=True, vertical_spacing=0.04)
+    for row, (col, (label, color)) in enumerate(channels.items(), start=1):
+        fig.add_trace(go.Scatter(
+            x=np.zeros(0, dtype="datetime64[ns]"), y=np.zeros(0), mode='lines', name=label,
+            line=dict(color=color, width=2)
+        ), row=row, col=1)
+        fig.update_yaxes(title_text=label, row=row, col=1)
+    fig.update_layout(
+        template='plotly_white',
+        height=200 * len(channels) + 80,
+        showlegend=False,
+        hovermode='x unified',
+        margin=dict(t=30)
+    )
+    return fig
+
+
+def extend_live_figure(fig: go.Figure, x: np.ndarray, values: dict, keep: int) -> None:
+    """Añade ``(x, values[canal])`` al final de cada traza, conservando los ``keep`` últimos.
+
+    ``x`` son marcas ``datetime64``; las trazas siguen el orden de ``values``.
+    """
+    with fig.batch_update():
+        for trace, y in zip(fig.data, values.values()):
+            trace.x = np.concatenate([np.asarray(trace.x, dtype=x.dtype), x])[-keep:]
+            trace.y = np.concatenate([np.asarray(trace.y, dtype=np.float64), y])[-keep:]
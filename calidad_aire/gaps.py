@@ -0,0 +1,156 @@
+"""Índice de cortes de adquisición y cobertura de los datos.
+
+El muestreo no es regular (una fila cada ~22 s con fluctuaciones) y hay cortes
+de minutos a horas. ``GapIndex`` se construye al cargar los datos con una
+pasada vectorizada sobre las marcas de tiempo ordenadas, y ``extend`` lo
+actualiza con las filas nuevas sin volver a recorrer el histórico (lo hace
+``IncrementalLoader`` en cada cola):
+
+- la cadencia medida es la mediana de las diferencias entre muestras, sacada
+  de un histograma logarítmico de las diferencias (error relativo < 0.1 %) que
+  se actualiza con cada cola;
+- un corte es un salto mayor que ``GAP_FACTOR`` veces la cadencia; se guarda
+  la última muestra antes del corte y la primera después. Los cortes de una
+  cola se deciden con la cadencia medida hasta ese momento.
+
+Con eso, la cobertura de un cubo de resample es el número de muestras frente
+a las esperadas con la cadencia medida, y las series se cortan con un punto
+NaN en cada corte para que Plotly no dibuje una recta sobre él.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .query import epoch_ns
+
+_NS_PER_S = 1_000_000_000
+
+# Un salto mayor que GAP_FACTOR veces la cadencia es un corte
+GAP_FACTOR = 5
+
+# Histograma de las diferencias: cubos de un 0.1 % desde 1 ms (hasta ~9 días)
+_STEP_MIN_NS = 1_000_000
+_STEP_LOG_BASE = np.log(1.001)
+_STEP_BINS = 20480
+
+
+def _step_bins(steps_ns: np.ndarray) -> np.ndarray:
+    scaled = np.log(np.maximum(steps_ns, _STEP_MIN_NS) / _STEP_MIN_NS) / _STEP_LOG_BASE
+    return np.minimum(scaled.astype(np.intp), _STEP_BINS - 1)
+
+
+def _median_step_ns(hist: np.ndarray) -> float:
+    """Centro del cubo del histograma que contiene la mediana."""
+    total = hist.sum()
+    if not total:
+        return float("nan")
+    i = int(np.searchsorted(np.cumsum(hist), (total + 1) // 2))
+    return _STEP_MIN_NS * np.exp((i + 0.5) * _STEP_LOG_BASE)
+
+
+class GapIndex:
+    """Cortes de una serie ordenada por tiempo.
+
+    ``start_ns``/``end_ns`` son la última muestra antes de cada corte y la
+    primera después (ordenados); ``cadence`` es la cadencia medida en
+    segundos (NaN con menos de dos muestras distintas). No se modifica:
+    ``extend`` devuelve otro índice.
+    """
+
+    def __init__(self, cadence, start_ns, end_ns, first_ns=None, last_ns=None, steps=None):
+        self.cadence = cadence
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.first_ns = first_ns
+        self.last_ns = last_ns
+        self.steps = np.zeros(_STEP_BINS, dtype=np.int64) if steps is None else steps
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "GapIndex":
+        empty = np.zeros(0, dtype=np.int64)
+        return cls(np.nan, empty, empty).extend(epoch_ns(df))
+
+    def extend(self, epoch: np.ndarray) -> "GapIndex":
+        """Índice con las muestras ``epoch`` (ns, ordenadas) añadidas al final."""
+        if not len(epoch):
+            return self
+        if self.last_ns is not None:
+            epoch = np.r_[self.last_ns, epoch]
+        dt = np.diff(epoch)
+        steps = dt[dt > 0]
+        hist = self.steps + np.bincount(_step_bins(steps), minlength=_STEP_BINS) if len(steps) else self.steps
+        cadence_ns = _median_step_ns(hist)
+        start_ns, end_ns = self.start_ns, self.end_ns
+        cut = np.flatnonzero(dt > GAP_FACTOR * cadence_ns)
+        if len(cut):
+            start_ns = np.r_[start_ns, epoch[cut]]
+            end_ns = np.r_[end_ns, epoch[cut + 1]]
+        first = self.first_ns if self.first_ns is not None else int(epoch[0])
+        return GapIndex(float(cadence_ns) / _NS_PER_S, start_ns, end_ns, first, int(epoch[-1]), hist)
+
+    def __len__(self):
+        return len(self.start_ns)
+
+    @property
+    def rate(self) -> float:
+        """Muestras esperadas por segundo."""
+        return 1.0 / self.cadence
+
+    def coverage(self, rows, seconds) -> np.ndarray:
+        """Fracción (0..1) de las muestras esperadas en ``seconds`` que hay en ``rows``."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.minimum(np.asarray(rows) / (np.asarray(seconds) * self.rate), 1.0)
+
+    def _inside(self, lo_ns: int, hi_ns: int) -> tuple[int, int]:
+        """Cortes ``[i, j)`` que empiezan y terminan dentro de ``[lo_ns, hi_ns]``."""
+        i = int(np.searchsorted(self.start_ns, lo_ns, side="left"))
+        j = int(np.searchsorted(self.end_ns, hi_ns, side="right"))
+        return i, max(i, j)
+
+    def summary(self, start, end, rows: int) -> dict:
+        """Cadencia, cortes y cobertura de las ``rows`` muestras entre ``start`` y ``end``."""
+        out = {"cadencia_s": self.cadence, "cortes": 0, "sin_datos_s": 0.0,
+               "mayor_corte_s": 0.0, "cobertura": np.nan}
+        if self.first_ns is None:
+            return out
+        lo = max(pd.Timestamp(start).value, self.first_ns)
+        hi = min(pd.Timestamp(end).value, self.last_ns)
+        if hi <= lo:
+            return out
+        # Cortes que se solapan con el rango, recortados a sus extremos
+        i = int(np.searchsorted(self.end_ns, lo, side="right"))
+        j = int(np.searchsorted(self.start_ns, hi, side="left"))
+        lengths = np.minimum(self.end_ns[i:j], hi) - np.maximum(self.start_ns[i:j], lo)
+        out["cortes"] = max(j - i, 0)
+        if len(lengths):
+            out["sin_datos_s"] = float(lengths.sum()) / _NS_PER_S
+            out["mayor_corte_s"] = float(lengths.max()) / _NS_PER_S
+        out["cobertura"] = float(self.coverage(rows, (hi - lo) / _NS_PER_S))
+        return out
+
+    def break_lines(self, x: pd.Series, y: pd.Series) -> tuple[pd.Series, pd.Series]:
+        """Inserta un punto NaN en el centro de cada corte entre los puntos de ``(x, y)``."""
+        if len(x) < 2:
+            return x, y
+        ns = x.array.asi8
+        i, j = self._inside(ns[0], ns[-1])
+        if i == j:
+            return x, y
+        at = np.searchsorted(ns, self.start_ns[i:j], side="right")
+        mid = self.start_ns[i:j] + (self.end_ns[i:j] - self.start_ns[i:j]) // 2
+        stamps = pd.DatetimeIndex(np.insert(ns, at, mid).view("datetime64[ns]")).tz_localize("UTC")
+        values = np.insert(y.to_numpy(dtype=np.float64), at, np.nan)
+        return pd.Series(stamps, name=x.name), pd.Series(values, name=y.name)
+
+
+def format_duration(seconds: float) -> str:
+    """``42 s``, ``12 min``, ``3.5 h`` o ``2.1 d``."""
+    if not np.isfinite(seconds):
+        return "—"
+    if seconds < 90:
+        return f"{seconds:.0f} s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 48 * 3600:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} d"
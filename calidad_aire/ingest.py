@@ -0,0 +1,289 @@
+"""Ingesta incremental del CSV de mediciones.
+
+El sistema de adquisición añade filas al final del CSV de forma continua.
+``IncrementalLoader`` recuerda hasta qué byte ha leído y cuál fue la última
+``timestamp``/``id_medicion`` ingerida; en cada ``refresh()`` solo parsea la
+cola nueva del fichero y la añade a las columnas que ya tiene en memoria.
+
+Con ``detect_events`` (por defecto) se añade la columna categórica ``Evento``
+(ver ``calidad_aire.events``); en cada ``refresh()`` solo se etiquetan las filas
+nuevas. El índice de cortes (``gaps``, ver ``calidad_aire.gaps``) también se
+actualiza solo con las filas nuevas.
+
+Con ``mmap_dir`` las columnas se guardan en ficheros proyectados en memoria
+(ver ``ColumnBuffer``).
+
+La reconstrucción completa (almacén columnar + cola del CSV) solo ocurre si el
+fichero se ha truncado o reescrito, o si las filas nuevas llegan desordenadas
+respecto a las ya ingeridas.
+"""
+
+import io
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import events, storage
+from .gaps import GapIndex
+from .query import epoch_ns
+from .schema import DASHBOARD_COLS, ID_COL, TIMESTAMP_COL
+
+_MIN_CAPACITY = 1024
+
+
+def _nullable_int(dtype) -> bool:
+    """``Int64`` y compañía: enteros con valores nulos (``pd.NA``)."""
+    return isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype)
+
+
+def _datetime_view(values: np.ndarray, dtype: pd.DatetimeTZDtype) -> pd.api.extensions.ExtensionArray:
+    """``DatetimeArray`` sobre los enteros ``values`` sin copiarlos (vía Arrow)."""
+    arrow = pa.Array.from_buffers(
+        pa.timestamp(dtype.unit, tz=str(dtype.tz)), len(values), [None, pa.py_buffer(values)]
+    )
+    return pa.table({"t": arrow}).to_pandas(split_blocks=True)["t"].array
+
+
+class ColumnBuffer:
+    """Columnas con capacidad de reserva para añadir filas en O(filas nuevas).
+
+    Los DataFrames que devuelve ``frame()`` son vistas de solo lectura sobre
+    los buffers; como solo se escribe a partir de la última fila, las vistas
+    ya entregadas no cambian.
+
+    Las columnas enteras con nulos (``Int64``) llevan un buffer de máscara
+    aparte; en las columnas enteras sin nulos y en las de fechas, un bloque
+    con nulos se rechaza con ``ValueError`` en lugar de convertir el nulo en
+    un entero arbitrario.
+
+    Con ``directory`` los buffers son ficheros proyectados en memoria
+    (``np.memmap``) que se borran al crearlos: la proyección sigue viva
+    mientras haya vistas, y sus páginas son de fichero, así que el sistema
+    puede descartarlas bajo presión de memoria en lugar de llevarlas a swap.
+    Eso solo vale si ``directory`` está en disco: en un tmpfs (``/tmp`` en
+    muchas distribuciones) las páginas son memoria compartida y van a swap.
+    """
+
+    def __init__(self, df: pd.DataFrame, directory=None):
+        self.columns = list(df.columns)
+        self.dtypes = dict(df.dtypes)
+        self.directory = directory
+        self.n = 0
+        self._data = {}
+        self._mask = {}
+        self._reserve(df, max(_MIN_CAPACITY, len(df) * 3 // 2))
+        self.append(df)
+
+    def _allocate(self, dtype, capacity: int) -> np.ndarray:
+        if self.directory is None:
+            return np.empty(capacity, dtype=dtype)
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.TemporaryFile(dir=self.directory, prefix="calidad_aire_") as f:
+            return np.memmap(f, dtype=dtype, mode="w+", shape=(capacity,))
+
+    def _reserve(self, template: pd.DataFrame, capacity: int) -> None:
+        data = {}
+        for col in self.columns:
+            dtype = template[col].dtype
+            if isinstance(dtype, pd.DatetimeTZDtype):
+                # Se guardan los enteros; ``frame()`` los envuelve sin copiar
+                buf = self._allocate(np.int64, capacity)
+            elif isinstance(dtype, pd.CategoricalDtype):
+                # Se guardan los códigos; las categorías son fijas
+                buf = self._allocate(template[col].cat.codes.dtype, capacity)
+            elif _nullable_int(dtype):
+                buf = self._allocate(dtype.numpy_dtype, capacity)
+                mask = self._allocate(np.bool_, capacity)
+                if self.n:
+                    mask[: self.n] = self._mask[col][: self.n]
+                self._mask[col] = mask
+            else:
+                buf = self._allocate(template[col].to_numpy().dtype, capacity)
+            if self.n:
+                buf[: self.n] = self._data[col][: self.n]
+            data[col] = buf
+        self._data = data
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data[self.columns[0]]) if self._data else 0
+
+    def append(self, df: pd.DataFrame) -> None:
+        m = self.n + len(df)
+        if m > self.capacity:
+            self._reserve(df, max(m, self.capacity * 2))
+        for col in self.columns:
+            dtype = self.dtypes[col]
+            if _nullable_int(dtype):
+                self._mask[col][self.n : m] = df[col].isna().to_numpy()
+                values = df[col].to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            elif (isinstance(dtype, pd.DatetimeTZDtype) or pd.api.types.is_integer_dtype(dtype)) and df[col].hasnans:
+                raise ValueError(f"{col}: valores nulos en una columna sin nulos")
+            elif isinstance(dtype, pd.DatetimeTZDtype):
+                values = df[col].array.tz_convert(dtype.tz).as_unit(dtype.unit).asi8
+            elif isinstance(dtype, pd.CategoricalDtype):
+                values = df[col].cat.codes.to_numpy()
+            else:
+                values = df[col].to_numpy()
+            self._data[col][self.n : m] = values
+        self.n = m
+
+    def frame(self) -> pd.DataFrame:
+        data = {}
+        for col in self.columns:
+            values = self._data[col][: self.n].view(np.ndarray)
+            values.flags.writeable = False
+            dtype = self.dtypes[col]
+            if isinstance(dtype, pd.DatetimeTZDtype):
+                values = _datetime_view(values, dtype)
+            elif isinstance(dtype, pd.CategoricalDtype):
+                # Los códigos ya se validaron al añadirlos
+                values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+            elif _nullable_int(dtype):
+                mask = self._mask[col][: self.n].view(np.ndarray)
+                mask.flags.writeable = False
+                values = pd.arrays.IntegerArray(values, mask)
+            data[col] = values
+        return pd.DataFrame(data, copy=False)
+
+
+class IncrementalLoader:
+    """Mantiene en memoria un CSV que crece por el final.
+
+    ``version`` cambia cada vez que cambian los datos: ``(generación, filas)``.
+    La generación solo aumenta en las reconstrucciones completas, así que
+    mientras no cambie, las filas de una versión anterior siguen siendo un
+    prefijo de las actuales.
+
+    ``gaps`` es el ``GapIndex`` de todas las filas ingeridas.
+    """
+
+    def __init__(self, path, columns=DASHBOARD_COLS, detect_events=True, mmap_dir=None):
+        self.path = str(path)
+        self.requested_columns = list(columns)
+        self.detect_events = detect_events
+        self.mmap_dir = mmap_dir
+        self.generation = 0
+        self.last_timestamp = None
+        self.last_id = None
+        self._buffer = None
+        self._frame = None
+        self.gaps = None
+        self._offset = 0
+        self._header = None
+        self._head_len = 0
+        self._head = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> tuple:
+        return (self.generation, self._buffer.n if self._buffer else 0)
+
+    @property
+    def offset(self) -> int:
+        """Byte del CSV hasta el que se han leído filas completas."""
+        return self._offset
+
+    def refresh(self) -> pd.DataFrame:
+        """Incorpora las filas nuevas del CSV y devuelve el DataFrame completo."""
+        with self._lock:
+            size = os.stat(self.path).st_size
+            if self._buffer is None or self._rewritten(size):
+                self._rebuild()
+            elif size > self._offset and not self._append_tail(size):
+                self._rebuild()
+            if self._frame is None:
+                self._frame = self._buffer.frame()
+            return self._frame
+
+    def _rewritten(self, size: int) -> bool:
+        if size < self._offset:
+            return True
+        return storage.head_digest(self.path, self._head_len) != self._head
+
+    def _rebuild(self) -> None:
+        store = storage.store_path(self.path)
+        meta = storage.read_metadata(store)
+        for attempt in range(2):
+            if attempt == 0 and storage.covers_prefix(self.path, meta):
+                # El CSV solo ha crecido desde la conversión: almacén + cola
+                df = storage.read_store(store, self.requested_columns)
+            else:
+                df = storage.load_measurements(self.path, self.requested_columns)
+                meta = storage.read_metadata(store)
+            if meta is None:
+                # No se pudo escribir el almacén: el DataFrame cubre todo el CSV
+                meta = self._csv_metadata()
+            if self.detect_events:
+                df = events.label(df)
+
+            self.generation += 1
+            self._buffer = ColumnBuffer(df, self.mmap_dir)
+            self._frame = None
+            self.gaps = GapIndex.build(df)
+            self._offset = meta["offset"]
+            self._head_len = meta["head_len"]
+            self._head = meta["head"]
+            with open(self.path, "rb") as f:
+                self._header = f.readline().decode("utf-8").strip().split(",")
+            self.last_timestamp = self.last_id = None
+            self._update_last(df)
+
+            size = os.stat(self.path).st_size
+            if size <= self._offset or self._append_tail(size):
+                return
+            # La cola no encaja con el almacén: se relee todo desde el CSV
+            meta = None
+
+    def _csv_metadata(self) -> dict:
+        _, offset = storage.read_complete_lines(self.path)
+        head_len = min(storage.HEAD_BYTES, offset)
+        return {
+            "offset": offset,
+            "head_len": head_len,
+            "head": storage.head_digest(self.path, head_len),
+        }
+
+    def _append_tail(self, size: int) -> bool:
+        """Parsea los bytes nuevos; devuelve False si no encajan tras lo ingerido."""
+        data, offset = storage.read_complete_lines(self.path, self._offset, size)
+        if not data:
+            return True
+
+        tail = pd.read_csv(io.BytesIO(data), header=None, names=self._header)
+        tail = storage.normalize(tail)
+        tail = tail.reindex(columns=self._buffer.columns)
+
+        if len(tail):
+            first = tail[TIMESTAMP_COL].iloc[0]
+            if self.last_timestamp is not None and first < self.last_timestamp:
+                return False
+            if ID_COL in tail.columns and self.last_id is not None:
+                # Las filas sin id no cuentan para el orden; si el buffer no
+                # admite nulos, ``append`` rechaza la cola y se reconstruye
+                ids = tail[ID_COL].dropna().to_numpy()
+                if len(ids) and (ids[0] <= self.last_id or (np.diff(ids) <= 0).any()):
+                    return False
+            if self.detect_events:
+                tail = events.label_tail(self._buffer.frame(), tail)
+            try:
+                self._buffer.append(tail)
+            except (TypeError, ValueError):
+                return False
+            self._frame = None
+            self.gaps = self.gaps.extend(epoch_ns(tail))
+            self._update_last(tail)
+
+        self._offset = offset
+        return True
+
+    def _update_last(self, df: pd.DataFrame) -> None:
+        if len(df):
+            self.last_timestamp = df[TIMESTAMP_COL].iloc[-1]
+            ids = df[ID_COL].dropna() if ID_COL in df.columns else ()
+            if len(ids):
+                self.last_id = ids.iloc[-1]
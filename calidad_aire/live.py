@@ -0,0 +1,212 @@
+"""Seguimiento en vivo de las mediciones del sistema de adquisición.
+
+Un ``Follower`` lee en un hilo en segundo plano las muestras nuevas de una
+fuente y las guarda en un ``RingBuffer``: un array NumPy de capacidad fija
+por canal. La memoria no crece por mucho tiempo que lleve en marcha, y leer
+la ventana cuesta lo mismo con una hora que con un mes de historia.
+
+Fuentes (``open_source``):
+
+- la ruta de un CSV de mediciones: ``FileTail`` lee las líneas completas que
+  se añaden al final (empieza en el final actual del fichero);
+- ``tcp://host:puerto``: ``SocketTail`` se conecta a un servicio que emite una
+  medición JSON por línea (NDJSON) con los mismos campos que el CSV, y se
+  reconecta si se corta.
+
+Cada lector guarda el ``total`` de su última lectura y ``RingBuffer.since``
+le devuelve solo las muestras que han llegado después, para añadirlas a lo que
+ya tiene en lugar de reconstruirlo.
+"""
+
+import io
+import json
+import os
+import socket
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .query import epoch_ns
+from .schema import ID_COL, SENSOR_COLS
+
+LIVE_SOURCE = os.environ.get("CALIDAD_AIRE_LIVE_SOURCE")
+# ~17 h de historia a una muestra cada 22 s
+LIVE_CAPACITY = int(os.environ.get("CALIDAD_AIRE_LIVE_CAPACITY", "2880"))
+POLL_S = 1.0
+
+
+class RingBuffer:
+    """Las últimas ``capacity`` muestras: marcas de tiempo y un array por canal.
+
+    ``total`` es el número de muestras añadidas desde el principio; la muestra
+    con número de secuencia ``s`` está en la posición ``s % capacity``.
+    """
+
+    def __init__(self, columns, capacity: int = LIVE_CAPACITY):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.total = 0
+        self.epoch = np.zeros(capacity, dtype=np.int64)
+        self.values = {col: np.full(capacity, np.nan) for col in self.columns}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, epoch: np.ndarray, values: dict) -> None:
+        """Añade muestras; las columnas que falten en ``values`` quedan en NaN."""
+        n = len(epoch)
+        skip = max(n - self.capacity, 0)  # solo caben las últimas
+        with self._lock:
+            pos = (self.total + np.arange(skip, n)) % self.capacity
+            self.epoch[pos] = epoch[skip:]
+            for col in self.columns:
+                column = values.get(col)
+                self.values[col][pos] = np.nan if column is None else column[skip:]
+            self.total += n
+
+    def since(self, sequence: int = 0) -> tuple[int, np.ndarray, dict]:
+        """Muestras con número de secuencia ``>= sequence`` que siguen en el buffer.
+
+        Devuelve ``(total, epoch, {canal: valores})``, en orden de llegada;
+        ``total`` es el ``sequence`` de la siguiente llamada.
+        """
+        with self._lock:
+            first = max(sequence, self.total - self.capacity, 0)
+            pos = np.arange(first, self.total) % self.capacity
+            return self.total, self.epoch[pos], {col: self.values[col][pos] for col in self.columns}
+
+
+class FileTail:
+    """Líneas añadidas a un CSV de mediciones desde que se abrió."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._header = f.readline().decode("utf-8").strip().split(",")
+            self._start = f.tell()
+        self._offset = os.stat(self.path).st_size
+
+    def read(self) -> pd.DataFrame | None:
+        size = os.stat(self.path).st_size
+        if size < self._offset:
+            self._offset = self._start  # fichero truncado o rotado
+        if size == self._offset:
+            return None
+        data, self._offset = storage.read_complete_lines(self.path, self._offset, size)
+        if not data:
+            return None
+        return storage.normalize(pd.read_csv(io.BytesIO(data), header=None, names=self._header))
+
+    def close(self) -> None:
+        pass
+
+
+class SocketTail:
+    """Mediciones NDJSON (una por línea) recibidas por TCP."""
+
+    def __init__(self, host: str, port: int, timeout: float = POLL_S):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock = None
+        self._pending = b""
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock.settimeout(self.timeout)
+        self._pending = b""
+
+    def read(self) -> pd.DataFrame | None:
+        if self._sock is None:
+            self._connect()
+        try:
+            chunk = self._sock.recv(1 << 16)
+        except socket.timeout:
+            return None
+        if not chunk:
+            self.close()
+            raise ConnectionError(f"conexión cerrada por {self.address[0]}:{self.address[1]}")
+        data = self._pending + chunk
+        cut = data.rfind(b"\n") + 1
+        data, self._pending = data[:cut], data[cut:]
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # línea corrupta: se descarta
+        if not records:
+            return None
+        return storage.normalize(pd.DataFrame.from_records(records))
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def open_source(spec: str):
+    """``tcp://host:puerto`` -> ``SocketTail``; cualquier otra cosa es la ruta de un CSV."""
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        return SocketTail(host or "127.0.0.1", int(port))
+    return FileTail(spec)
+
+
+class Follower:
+    """Hilo que pasa las muestras nuevas de ``source`` a un ``RingBuffer``.
+
+    ``error`` guarda el último fallo de la fuente (``None`` si la última
+    lectura fue bien); tras un fallo se reintenta en la siguiente consulta.
+    """
+
+    def __init__(self, source, columns=SENSOR_COLS, capacity: int = LIVE_CAPACITY, poll_s: float = POLL_S):
+        self.source = source
+        self.buffer = RingBuffer(columns, capacity)
+        self.poll_s = poll_s
+        self.error = None
+        self.last_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "Follower":
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="calidad-aire-vivo", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.source.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                rows = self.source.read()
+                self.error = None
+            except (OSError, ValueError, KeyError) as exc:
+                self.error = str(exc)
+                rows = None
+            if rows is not None and len(rows):
+                self.push(rows)
+            elif isinstance(self.source, FileTail) or self.error:
+                # El socket ya espera en recv; el fichero se consulta a intervalos
+                self._stop.wait(self.poll_s)
+
+    def push(self, df: pd.DataFrame) -> None:
+        """Añade al buffer las filas de ``df`` (ya normalizadas)."""
+        self.buffer.append(
+            epoch_ns(df),
+            {col: df[col].to_numpy(dtype=np.float64) for col in self.buffer.columns if col in df.columns},
+        )
+        if ID_COL in df.columns:
+            self.last_id = df[ID_COL].iloc[-1]
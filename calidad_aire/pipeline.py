@@ -0,0 +1,218 @@
+"""Pipeline de datos del dashboard, sin dependencias de Streamlit.
+
+``app.py`` y el generador de informes (``calidad_aire.report``) comparten
+estas funciones: combinación de sitios, selección de fechas, resample con cobertura,
+series reducidas para los gráficos, episodios y eventos de un rango, tablas
+formateadas y figuras. La app las envuelve en sus cachés; el informe las llama
+directamente.
+
+Los sitios no se mezclan en nada que dependa del orden de las muestras: la
+pirámide, los cortes, las medias móviles y las series de los gráficos se
+calculan por sitio (diccionarios ``{sitio: ...}``) y solo se juntan al final
+(``combine_sites``), con la columna ``sitio``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .compliance import GUIDELINES, exceedances
+from .dataset import merge_order
+from .decimate import minmax_indices
+from .events import onsets
+from .figures import co2_figure, pm_figure, profile_band_figure, profile_figure, series_figure
+from .query import epoch_ns, range_bounds, time_slice
+from .rollup import RESAMPLE_SECONDS
+from .schema import EVENT_COL, SITE_COL, TIMESTAMP_COL
+from .stats import STAT_COLUMNS
+
+NO_RESAMPLE = "Sin resample"
+RESAMPLE_OPTIONS = [NO_RESAMPLE] + list(RESAMPLE_SECONDS)
+
+# Presupuesto de puntos por serie: un cubo min/max por columna de píxeles
+CHART_PX = 1400
+CHART_PX_HALF = 700
+
+PM_LABELS = {
+    "PM1_ug_m3": "PM 1.0",
+    "PM2_5_ug_m3": "PM 2.5",
+    "PM4_ug_m3": "PM 4.0",
+    "PM10_ug_m3": "PM 10"
+}
+PM_COLORS = {
+    "PM1_ug_m3": "#ef4444",
+    "PM2_5_ug_m3": "#f97316",
+    "PM4_ug_m3": "#f59e0b",
+    "PM10_ug_m3": "#eab308"
+}
+# Canal -> (color, relleno, título del eje) de las series simples
+SERIES_STYLE = {
+    "temperatura_C": ('#f59e0b', 'rgba(245, 158, 11, 0.15)', "Temperatura (°C)"),
+    "humedad_relativa_pct": ('#3b82f6', 'rgba(59, 130, 246, 0.15)', "Humedad (%)"),
+}
+STAT_LABELS = ["Recuento", "Media", "Desv. Est.", "Mínimo", "Q1 (25%)", "Mediana", "Q3 (75%)", "Máximo"]
+
+
+def combine_sites(frames: dict) -> pd.DataFrame:
+    """Une los resultados por sitio en orden temporal, con la columna ``sitio``.
+
+    Cada DataFrame ya está ordenado por tiempo, así que se mezclan sus tramos
+    (``merge_order``) en lugar de ordenar el conjunto. Con un solo sitio
+    devuelve su DataFrame tal cual.
+    """
+    if len(frames) == 1:
+        return next(iter(frames.values()))
+    dtype = pd.CategoricalDtype(list(frames))
+    parts = [
+        f.assign(**{SITE_COL: pd.Categorical.from_codes(np.full(len(f), i, dtype=np.int16), dtype=dtype)})
+        for i, f in enumerate(frames.values())
+    ]
+    order = merge_order([epoch_ns(f) for f in parts])
+    return pd.concat(parts, ignore_index=True).take(order).reset_index(drop=True)
+
+
+def date_bounds(start_date, end_date) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Instantes UTC del principio de ``start_date`` y del final de ``end_date``."""
+    start = pd.to_datetime(start_date, utc=True)
+    end = pd.to_datetime(end_date, utc=True) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return start, end
+
+
+def resampled(df_range: pd.DataFrame, pyramid, resample: str, start, end, gaps=None) -> pd.DataFrame:
+    """Muestras del rango o, con resample, medias por cubo de la pirámide.
+
+    Con ``gaps`` (``GapIndex``) los cubos llevan la columna ``cobertura``.
+    """
+    if resample == NO_RESAMPLE:
+        return df_range
+    return pyramid.mean(RESAMPLE_SECONDS[resample], start, end, rate=gaps.rate if gaps is not None else None)
+
+
+def site_series(frames: dict, column: str, budget: int, gaps=None, label: str | None = None) -> dict:
+    """``{nombre de traza: (x, y)}`` con una serie reducida por sitio.
+
+    ``gaps`` es ``{sitio: GapIndex}`` o ``None``; con un solo sitio la traza se
+    llama ``label``.
+    """
+    if len(frames) == 1:
+        ((site, df),) = frames.items()
+        return {label or site: reduced_series(df, column, budget, gaps[site] if gaps else None)}
+    return {
+        site: reduced_series(df, column, budget, gaps[site] if gaps else None)
+        for site, df in frames.items() if len(df)
+    }
+
+
+def reduced_series(df: pd.DataFrame, column: str, budget: int, gaps=None) -> tuple[pd.Series, pd.Series]:
+    """Serie ``(x, y)`` reducida a ``budget`` cubos min/max para Plotly.
+
+    Con ``gaps`` se corta la línea en cada corte de adquisición.
+    """
+    idx = minmax_indices(epoch_ns(df), df[column].to_numpy(), budget)
+    x, y = df[TIMESTAMP_COL].iloc[idx], df[column].iloc[idx]
+    return gaps.break_lines(x, y) if gaps is not None else (x, y)
+
+
+def range_exceedances(df: pd.DataFrame, rolling: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Episodios de superación de las guías entre ``start`` y ``end``."""
+    i, j = range_bounds(epoch_ns(df), start, end)
+    return exceedances(df, rolling, i, j)
+
+
+def site_exceedances(frames: dict, rolling: dict, start, end) -> pd.DataFrame:
+    """Episodios de cada sitio (medias móviles propias); con varios, columna ``sitio``."""
+    parts = []
+    for site, df in frames.items():
+        found = range_exceedances(df, rolling[site], start, end)
+        if len(frames) > 1:
+            found.insert(0, SITE_COL, site)
+        parts.append(found)
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def range_onsets(df: pd.DataFrame, start, end) -> pd.DataFrame | None:
+    """Inicio de cada evento del rango; ``None`` si no hay columna de eventos."""
+    if EVENT_COL not in df.columns:
+        return None
+    return onsets(time_slice(df, start, end), SITE_COL)
+
+
+def event_counts(events: pd.DataFrame | None) -> dict:
+    """Número de eventos de cada tipo (solo los que aparecen)."""
+    if events is None or not len(events):
+        return {}
+    return {kind: int(n) for kind, n in events[EVENT_COL].value_counts().items() if n}
+
+
+def format_episodes(episodes: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de episodios con nombres y fechas para mostrar."""
+    return episodes.assign(
+        canal=episodes["canal"].map(lambda c: f"{c} ({GUIDELINES[c][0] // 3600} h)"),
+        inicio=episodes["inicio"].dt.strftime("%d/%m/%Y %H:%M"),
+        fin=episodes["fin"].dt.strftime("%d/%m/%Y %H:%M"),
+    ).rename(columns={
+        SITE_COL: "Sitio",
+        "canal": "Canal (ventana)",
+        "inicio": "Inicio",
+        "fin": "Fin",
+        "duracion_h": "Duración (h)",
+        "pico": "Pico de la media",
+        "limite": "Límite",
+    }).round(1)
+
+
+def format_stats(stats: pd.DataFrame, columns) -> pd.DataFrame:
+    """Estadísticas descriptivas de ``columns`` con las etiquetas de la tabla."""
+    table = stats.loc[list(columns), STAT_COLUMNS[: len(STAT_LABELS)]].round(2)
+    table.columns = STAT_LABELS
+    return table
+
+
+# Las figuras de series reciben ``frames = {sitio: DataFrame}`` y ``gaps =
+# {sitio: GapIndex}`` (o ``None``): una traza por sitio
+
+
+def co2_chart_figure(frames: dict, gaps=None, events=None):
+    series = site_series(frames, "CO2_ppm", CHART_PX, gaps, label="CO₂")
+    y_max = np.nanmax([df["CO2_ppm"].max() for df in frames.values() if len(df)])
+    return co2_figure(series, y_max=y_max, events=events)
+
+
+def series_chart_figure(frames: dict, column: str, gaps=None):
+    color, fillcolor, yaxis_title = SERIES_STYLE[column]
+    series = site_series(frames, column, CHART_PX_HALF, gaps, label=yaxis_title)
+    return series_figure(series, color, fillcolor, yaxis_title)
+
+
+def pm_chart_figure(frames: dict, columns, gaps=None, episodes=None, events=None):
+    series = {}
+    for pm_col in columns:
+        for name, xy in site_series(frames, pm_col, CHART_PX, gaps, label=pm_col).items():
+            series[pm_col if len(frames) == 1 else (pm_col, name)] = xy
+    return pm_figure(series, PM_LABELS, PM_COLORS, episodes=episodes, events=events)
+
+
+def profile_chart_figures(hourly: pd.DataFrame, split_week: bool, pm_columns):
+    """Figuras del perfil horario de CO₂ y de PM (``None`` si no hay canal)."""
+    groups = ["laborable", "fin de semana"] if split_week else ["todos"]
+    group_labels = {"todos": "Todos los días", "laborable": "Laborables", "fin de semana": "Fin de semana"}
+    group_colors = {"Todos los días": "#667eea", "Laborables": "#667eea", "Fin de semana": "#ec4899"}
+    hours = list(range(24))
+
+    fig_co2 = None
+    if "CO2_ppm" in hourly.columns.get_level_values(0):
+        fig_co2 = profile_band_figure(
+            hours,
+            {group_labels[g]: hourly.loc[g]["CO2_ppm"] for g in groups},
+            group_colors,
+            "CO₂ medio (ppm)"
+        )
+
+    fig_pm = None
+    if pm_columns:
+        pm_series = {}
+        for g in groups:
+            suffix = f" ({group_labels[g].lower()})" if split_week else ""
+            for pm_col in pm_columns:
+                pm_series[PM_LABELS.get(pm_col, pm_col) + suffix] = hourly.loc[g][(pm_col, "mean")]
+        fig_pm = profile_figure(hours, pm_series, "Concentración media (µg/m³)")
+    return fig_co2, fig_pm
@@ -0,0 +1,114 @@
+"""Perfil por hora del día, con bandas de percentiles y división laborable/fin de semana.
+
+La hora del día y el día de la semana se obtienen con aritmética entera sobre
+los segundos epoch (UTC, como el resto del dashboard). Todas las muestras se
+agrupan de una vez en 48 claves (24 horas x laborable/fin de semana) con una
+ordenación por clave pequeña; de cada grupo salen los percentiles de todos los
+canales. El perfil de «todos los días» se obtiene combinando los dos grupos de
+cada hora, sin volver a recorrer los datos.
+
+Si se pasa el nivel horario de la pirámide (``rollup``), las medias se
+combinan a partir de sus sumas y recuentos por cubo en lugar de las muestras.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .query import epoch_ns
+from .stats import quantiles
+
+PERCENTILES = (10, 50, 90)
+GROUPS = ("todos", "laborable", "fin de semana")
+STATS = ("mean", "p10", "p50", "p90", "count")
+
+_NS_PER_S = 1_000_000_000
+_HOURS = 24
+
+
+def hour_keys(epoch_s: np.ndarray) -> np.ndarray:
+    """Clave 0..47: hora del día, +24 si es sábado o domingo (UTC)."""
+    hour = (epoch_s // 3600) % _HOURS
+    # 1970-01-01 fue jueves: (días + 3) % 7 da 0 = lunes ... 6 = domingo
+    weekend = (epoch_s // 86400 + 3) % 7 >= 5
+    return (hour + _HOURS * weekend).astype(np.uint8)
+
+
+def _group_sums(values: np.ndarray, bounds: np.ndarray):
+    """Suma y recuento de valores válidos de cada grupo.
+
+    ``values`` es ``(canales, muestras)`` con las muestras ya agrupadas.
+    """
+    n_groups = len(bounds) - 1
+    sums = np.zeros((values.shape[0], n_groups))
+    counts = np.zeros((values.shape[0], n_groups), dtype=np.int64)
+    # reduceat solo sobre los grupos con muestras: cada tramo llega hasta el
+    # inicio del siguiente grupo no vacío, o hasta el final
+    filled = np.flatnonzero(bounds[:-1] < bounds[1:])
+    if len(filled):
+        valid = ~np.isnan(values)
+        starts = bounds[filled]
+        sums[:, filled] = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=1)
+        counts[:, filled] = np.add.reduceat(valid, starts, axis=1, dtype=np.int64)
+    return sums.T, counts.T
+
+
+def _tier_sums(tier, start, end, n_ch):
+    i, j = tier.bounds(start, end)
+    bucket_s = (tier.first + np.arange(i, j)) * tier.seconds
+    keys = hour_keys(bucket_s).astype(np.intp)
+    sums = np.zeros((2 * _HOURS, n_ch))
+    counts = np.zeros((2 * _HOURS, n_ch))
+    np.add.at(sums, keys, tier.sum[i:j])
+    np.add.at(counts, keys, tier.count[i:j])
+    return sums, counts
+
+
+def hourly_profile(df: pd.DataFrame, columns, tier=None, start=None, end=None) -> pd.DataFrame:
+    """Perfil horario de ``columns``.
+
+    Devuelve un DataFrame con índice ``(grupo, hora)`` y columnas
+    ``(canal, estadístico)``, con los estadísticos de ``STATS``. ``tier``
+    (nivel de una hora de la pirámide) y ``start``/``end`` son opcionales; si
+    se dan, las medias salen de los agregados por hora de ese rango.
+    """
+    columns = list(columns)
+    n_ch = len(columns)
+    keys = hour_keys(epoch_ns(df) // _NS_PER_S)
+    order = np.argsort(keys, kind="stable")
+    # Un canal por fila: cada grupo es un tramo contiguo de cada fila
+    values = df[columns].to_numpy(dtype=np.float64).T[:, order]
+    bounds = np.searchsorted(keys[order], np.arange(2 * _HOURS + 1))
+
+    if tier is None:
+        sums, counts = _group_sums(values, bounds)
+    else:
+        sums, counts = _tier_sums(tier, start, end, n_ch)
+
+    def block(g):
+        return values[:, bounds[g]:bounds[g + 1]]
+
+    out = np.full((len(GROUPS), _HOURS, n_ch, len(STATS)), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for h in range(_HOURS):
+            parts = {
+                "laborable": ([h], block(h)),
+                "fin de semana": ([h + _HOURS], block(h + _HOURS)),
+                "todos": ([h, h + _HOURS], np.hstack([block(h), block(h + _HOURS)])),
+            }
+            for gi, group in enumerate(GROUPS):
+                rows, data = parts[group]
+                n = counts[rows].sum(axis=0)
+                out[gi, h, :, 0] = sums[rows].sum(axis=0) / n
+                out[gi, h, :, 4] = n
+                if data.shape[1]:
+                    out[gi, h, :, 1:4] = _nanpercentiles(data)
+
+    index = pd.MultiIndex.from_product([GROUPS, range(_HOURS)], names=["grupo", "hora"])
+    cols = pd.MultiIndex.from_product([columns, STATS], names=["canal", "estadistico"])
+    return pd.DataFrame(out.reshape(len(GROUPS) * _HOURS, n_ch * len(STATS)), index=index, columns=cols)
+
+
+def _nanpercentiles(data: np.ndarray) -> np.ndarray:
+    """Percentiles de cada canal (fila) ignorando NaN; canales vacíos -> NaN."""
+    qs = [p / 100 for p in PERCENTILES]
+    return np.array([quantiles(row[~np.isnan(row)], qs) for row in data])
@@ -0,0 +1,157 @@
+"""Perfilado opcional de cada ejecución del script del dashboard.
+
+Con el perfilado activo (``CALIDAD_AIRE_PROFILE=1`` o el interruptor de la
+barra lateral), cada etapa envuelta en ``Profiler.stage`` registra:
+
+- el tiempo de reloj;
+- las filas de entrada y de salida, si se indican;
+- el pico de memoria reservada durante la etapa respecto a su inicio
+  (``tracemalloc``).
+
+``tracemalloc`` es global del proceso y todas las sesiones del servidor lo
+comparten: se arranca con el primer perfilador activo y solo se para cuando
+no queda ninguno. Por lo mismo, el pico es del proceso: si otra sesión está
+midiendo a la vez, el pico de una etapa incluye también sus reservas.
+
+Al final de la ejecución el registro completo se añade como una línea al log
+JSONL (``CALIDAD_AIRE_PROFILE_LOG``, por defecto ``logs/perfil.jsonl``) para
+seguir la evolución con el crecimiento de los datos.
+
+Desactivado, ``stage`` devuelve siempre el mismo contexto vacío: no mide nada
+y no mantiene ``tracemalloc`` en marcha (trazar todas las reservas tiene coste).
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from pathlib import Path
+
+PROFILE_ENV = os.environ.get("CALIDAD_AIRE_PROFILE", "").lower() in ("1", "true", "yes", "si", "sí")
+PROFILE_LOG = os.environ.get("CALIDAD_AIRE_PROFILE_LOG", "logs/perfil.jsonl")
+
+RECORD_COLUMNS = ["etapa", "segundos", "filas_entrada", "filas_salida", "pico_mb"]
+
+
+class StageRecord:
+    """Medidas de una etapa; ``rows_out`` se puede fijar dentro del ``with``."""
+
+    __slots__ = ("name", "seconds", "rows_in", "rows_out", "peak_mb")
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.seconds = 0.0
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.peak_mb = None
+
+    def as_dict(self) -> dict:
+        return dict(zip(RECORD_COLUMNS, (self.name, self.seconds, self.rows_in, self.rows_out, self.peak_mb)))
+
+
+# Contexto compartido cuando el perfilado está desactivado
+_DISABLED = contextlib.nullcontext(StageRecord("desactivado"))
+
+
+class _Tracing:
+    """Uso compartido de ``tracemalloc`` entre los perfiladores del proceso.
+
+    ``users`` cuenta los perfiladores activos y ``measuring`` las etapas en
+    curso; el pico solo se reinicia cuando no hay ninguna otra etapa midiendo.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+        self.measuring = 0
+
+    def acquire(self) -> None:
+        with self.lock:
+            self.users += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def release(self) -> None:
+        with self.lock:
+            self.users -= 1
+            if not self.users and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def begin(self) -> int:
+        with self.lock:
+            if not self.measuring:
+                tracemalloc.reset_peak()
+            self.measuring += 1
+            return tracemalloc.get_traced_memory()[0]
+
+    def end(self) -> int:
+        with self.lock:
+            self.measuring -= 1
+            return tracemalloc.get_traced_memory()[1]
+
+
+_TRACING = _Tracing()
+
+
+class Profiler:
+    """Temporizadores con nombre para una ejecución del script.
+
+    Un perfilador activo mantiene ``tracemalloc`` en marcha hasta ``close``
+    (o hasta que se libera el objeto, si la ejecución se interrumpe).
+    """
+
+    def __init__(self, enabled: bool = PROFILE_ENV):
+        self.enabled = enabled
+        self.records = []
+        self._started = time.perf_counter()
+        self._release = None
+        if enabled:
+            _TRACING.acquire()
+            self._release = weakref.finalize(self, _TRACING.release)
+
+    def close(self) -> None:
+        """Deja de usar ``tracemalloc`` (se para si no lo usa nadie más)."""
+        if self._release is not None:
+            self._release()
+
+    def stage(self, name: str, rows_in: int | None = None):
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(name, rows_in)
+
+    @contextlib.contextmanager
+    def _measure(self, name, rows_in):
+        record = StageRecord(name, rows_in)
+        base = _TRACING.begin()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - t0
+            record.peak_mb = (_TRACING.end() - base) / 2**20
+            self.records.append(record)
+
+    @property
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self._started
+
+    def rows(self) -> list[dict]:
+        return [r.as_dict() for r in self.records]
+
+    def write_log(self, path=PROFILE_LOG, **extra) -> None:
+        """Añade el registro de la ejecución como una línea JSON en ``path``."""
+        if not self.enabled:
+            return
+        entry = {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_s": self.total_seconds,
+            **extra,
+            "etapas": self.rows(),
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,40 @@
+"""Consultas por rango de tiempo sobre las mediciones ordenadas."""
+
+import numpy as np
+import pandas as pd
+
+from .schema import TIMESTAMP_COL
+
+
+def epoch_ns(df: pd.DataFrame) -> np.ndarray:
+    """Marcas de tiempo como int64 (ns epoch), sin copiar la columna."""
+    return df[TIMESTAMP_COL].array.asi8
+
+
+def range_bounds(epoch: np.ndarray, start, end) -> tuple[int, int]:
+    """Posiciones ``[i, j)`` de las muestras con ``start <= t <= end``.
+
+    ``epoch`` debe estar ordenado; la búsqueda es binaria (O(log n)).
+    """
+    lo = pd.Timestamp(start).as_unit("ns").value
+    hi = pd.Timestamp(end).as_unit("ns").value
+    i = int(np.searchsorted(epoch, lo, side="left"))
+    j = int(np.searchsorted(epoch, hi, side="right"))
+    return i, j
+
+
+def window_starts(epoch: np.ndarray, window_ns: int, lo: int = 0) -> np.ndarray:
+    """Primera fila de la ventana ``(t - w, t]`` de cada fila desde ``lo``.
+
+    Con ``epoch`` ordenado equivale a recorrerlo con dos punteros.
+    """
+    return np.searchsorted(epoch, epoch[lo:] - window_ns, side="right")
+
+
+def time_slice(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Filas de ``df`` (ordenado por tiempo) entre ``start`` y ``end`` incluidos.
+
+    Devuelve un slice posicional, sin máscara booleana ni copia de los datos.
+    """
+    i, j = range_bounds(epoch_ns(df), start, end)
+    return df.iloc[i:j]
@@ -0,0 +1,341 @@
+"""Informes estáticos por sitio y rango de fechas, sin navegador ni Streamlit.
+
+Para cada fichero de mediciones (un sitio) y cada rango de fechas calcula lo
+mismo que el dashboard con ``calidad_aire.pipeline`` y lo escribe en
+``<salida>/<sitio>/<inicio>_<fin>/``:
+
+- ``resumen.json``: medias de los KPIs, calidad de los datos (cadencia,
+  cobertura, cortes), número de episodios y de eventos;
+- ``estadisticas.csv``, ``perfil_horario.csv``, ``episodios.csv``,
+  ``eventos.csv`` y ``datos.csv`` (datos del rango con el resample elegido);
+- figuras en HTML (``co2``, ``temperatura``, ``humedad``, ``particulas``,
+  ``perfil_co2``, ``perfil_pm``) y en PNG si está instalado ``kaleido``.
+
+Los ficheros se reparten en un pool de procesos; cada proceso carga su fichero
+una vez (desde el almacén columnar, que se reutiliza entre ejecuciones) y
+calcula la pirámide, los cortes y las medias móviles una sola vez para todos
+los rangos. Un informe cuyo ``manifiesto.json`` coincide con el fichero de
+origen, el rango y las opciones no se vuelve a generar mientras sigan valiendo
+los datos que lo cubren: si al generarlo ya había filas posteriores al rango,
+basta con que el CSV solo haya crecido por el final; si no, el CSV no puede
+haber cambiado.
+
+Uso::
+
+    python -m calidad_aire.report data/*.csv --range 2026-01-27:2026-02-01 --out informes
+    python -m calidad_aire.report data/*.csv --last-days 1 --png   # informe nocturno
+"""
+
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .compliance import ComplianceEngine
+from .dataset import site_ids
+from .ingest import IncrementalLoader
+from .pipeline import (
+    RESAMPLE_OPTIONS, co2_chart_figure, date_bounds, event_counts, format_episodes,
+    format_stats, pm_chart_figure, profile_chart_figures, range_exceedances, range_onsets,
+    resampled, series_chart_figure
+)
+from .profile import hourly_profile
+from .query import time_slice
+from .rollup import build_pyramid
+from .schema import EVENT_COL, PM_COLS, SENSOR_COLS, TIMESTAMP_COL
+from .stats import describe
+
+REPORT_FORMAT = 2
+OUT_DIR = "informes"
+MANIFEST = "manifiesto.json"
+
+
+def png_available() -> bool:
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_range(text: str) -> tuple[str, str]:
+    """``2026-01-27:2026-02-01`` (o una sola fecha) -> fechas ISO de inicio y fin."""
+    start, _, end = text.partition(":")
+    start = pd.Timestamp(start).date().isoformat()
+    end = pd.Timestamp(end or start).date().isoformat()
+    if end < start:
+        raise ValueError(f"rango vacío: {text}")
+    return start, end
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if not np.isfinite(value) else float(value)
+    return value
+
+
+def _write_json(path: Path, data) -> None:
+    path.write_text(json.dumps(_jsonable(data), indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def _write_figure(fig, path: Path, png: bool) -> list[str]:
+    if fig is None:
+        return []
+    fig.write_html(path.with_suffix(".html"), include_plotlyjs="cdn")
+    written = [path.with_suffix(".html").name]
+    if png:
+        fig.write_image(path.with_suffix(".png"), width=1400, height=fig.layout.height or 500)
+        written.append(path.with_suffix(".png").name)
+    return written
+
+
+def _manifest_key(csv_path, start: str, end: str, resample: str, png: bool) -> dict:
+    return {
+        "formato": REPORT_FORMAT,
+        "fuente": str(Path(csv_path).resolve()),
+        "rango": [start, end],
+        "resample": resample,
+        "png": png,
+    }
+
+
+def _coverage(csv_path, data: "SiteData", end_ts) -> dict:
+    """Datos del CSV de los que depende el informe de un rango que acaba en ``end_ts``.
+
+    Con filas posteriores al rango (rango cerrado), las filas nuevas ya no
+    cambian el informe: vale mientras el CSV empiece igual y conserve los bytes
+    leídos. Un rango abierto depende del fichero entero.
+    """
+    head_len = min(storage.HEAD_BYTES, data.offset)
+    return {
+        "cerrado": bool(len(data.df)) and data.df[TIMESTAMP_COL].iloc[-1] > end_ts,
+        "offset": data.offset,
+        "head_len": head_len,
+        "head": storage.head_digest(csv_path, head_len),
+        "firma": data.signature,
+    }
+
+
+def _covers(csv_path, coverage: dict | None) -> bool:
+    """Indica si los datos descritos por ``_coverage`` siguen en el CSV."""
+    if coverage is None:
+        return False
+    try:
+        signature = storage.source_signature(csv_path)
+    except OSError:
+        return False
+    if not coverage["cerrado"]:
+        return signature == coverage["firma"]
+    if signature["size"] < coverage["offset"]:
+        return False
+    return storage.head_digest(csv_path, coverage["head_len"]) == coverage["head"]
+
+
+def _cached(report_dir: Path, key: dict, csv_path) -> dict | None:
+    try:
+        manifest = json.loads((report_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("clave") != key or not _covers(csv_path, manifest.get("datos")):
+        return None
+    return manifest
+
+
+class SiteData:
+    """Datos de un sitio y los resultados que comparten todos sus rangos."""
+
+    def __init__(self, csv_path):
+        # Firma previa a la lectura: si el CSV crece mientras tanto, los
+        # informes de rangos abiertos se rehacen en la siguiente ejecución
+        self.signature = storage.source_signature(csv_path)
+        loader = IncrementalLoader(csv_path)
+        self.df = loader.refresh()
+        self.offset = loader.offset
+        self.pyramid = build_pyramid(self.df)
+        self.gaps = loader.gaps
+        self.rolling = ComplianceEngine().update(self.df, 1)
+        self.channels = [c for c in SENSOR_COLS if c in self.df.columns]
+
+    def last_days(self, days: int) -> tuple[str, str]:
+        """Rango de los ``days`` últimos días con datos."""
+        end = self.df[TIMESTAMP_COL].iloc[-1].date()
+        return (end - pd.Timedelta(days=days - 1)).isoformat(), end.isoformat()
+
+
+def write_report(data: SiteData, site: str, report_dir: Path, start: str, end: str, resample: str,
+                 png: bool) -> dict:
+    """Escribe el informe de un rango y devuelve su resumen."""
+    report_dir.mkdir(parents=True, exist_ok=True)
+    start_ts, end_ts = date_bounds(start, end)
+    df = data.df
+    df_range = time_slice(df, start_ts, end_ts)
+    df_f = resampled(df_range, data.pyramid, resample, start_ts, end_ts, data.gaps)
+    channels = [c for c in data.channels if c in df_f.columns]
+    pm_columns = [c for c in PM_COLS if c in channels]
+
+    stats = describe(df_f, channels)
+    hourly = hourly_profile(df_range, channels, tier=data.pyramid.tiers[3600], start=start_ts, end=end_ts)
+    episodes = range_exceedances(df, data.rolling, start_ts, end_ts)
+    events = range_onsets(df, start_ts, end_ts)
+    line_gaps = {site: data.gaps} if resample == RESAMPLE_OPTIONS[0] else None
+    frames = {site: df_f}
+
+    format_stats(stats, channels).to_csv(report_dir / "estadisticas.csv")
+    hourly.to_csv(report_dir / "perfil_horario.csv")
+    format_episodes(episodes).to_csv(report_dir / "episodios.csv", index=False)
+    if events is not None:
+        events[[TIMESTAMP_COL, EVENT_COL]].to_csv(report_dir / "eventos.csv", index=False)
+    df_f.to_csv(report_dir / "datos.csv", index=False)
+
+    files = []
+    if len(df_f):
+        if "CO2_ppm" in channels:
+            files += _write_figure(co2_chart_figure(frames, line_gaps, events), report_dir / "co2", png)
+        for column, name in (("temperatura_C", "temperatura"), ("humedad_relativa_pct", "humedad")):
+            if column in channels:
+                files += _write_figure(series_chart_figure(frames, column, line_gaps), report_dir / name, png)
+        if pm_columns:
+            fig = pm_chart_figure(frames, pm_columns, line_gaps, episodes=episodes, events=events)
+            files += _write_figure(fig, report_dir / "particulas", png)
+        fig_co2, fig_pm = profile_chart_figures(hourly, False, pm_columns)
+        files += _write_figure(fig_co2, report_dir / "perfil_co2", png)
+        files += _write_figure(fig_pm, report_dir / "perfil_pm", png)
+
+    summary = {
+        "rango": [start, end],
+        "resample": resample,
+        "muestras": len(df_range),
+        "filas": len(df_f),
+        "medias": {c: stats.loc[c, "mean"] for c in channels},
+        "calidad": data.gaps.summary(start_ts, end_ts, len(df_range)),
+        "episodios": len(episodes),
+        "eventos": event_counts(events),
+        "figuras": files,
+    }
+    summary = _jsonable(summary)
+    _write_json(report_dir / "resumen.json", summary)
+    return summary
+
+
+def site_reports(csv_path, site, ranges, last_days, out_dir, resample: str, png: bool,
+                 force: bool) -> list[dict]:
+    """Informes de un fichero para cada rango (``ranges`` y/o los ``last_days`` últimos días).
+
+    Se ejecuta en un proceso del pool; devuelve una entrada de índice por informe.
+    """
+    t0 = time.perf_counter()
+    data = None
+    ranges = list(ranges)
+    if last_days or not ranges:
+        data = SiteData(csv_path)
+        if last_days:
+            ranges.append(data.last_days(last_days))
+        if not ranges:
+            first = data.df[TIMESTAMP_COL].iloc[0].date().isoformat()
+            ranges.append((first, data.df[TIMESTAMP_COL].iloc[-1].date().isoformat()))
+
+    entries = []
+    for start, end in ranges:
+        report_dir = Path(out_dir) / site / f"{start}_{end}"
+        key = _manifest_key(csv_path, start, end, resample, png)
+        cached = None if force else _cached(report_dir, key, csv_path)
+        if cached is not None:
+            entries.append({"sitio": site, "directorio": str(report_dir), "en_cache": True, **cached["resumen"]})
+            continue
+        if data is None:
+            data = SiteData(csv_path)
+        summary = write_report(data, site, report_dir, start, end, resample, png)
+        coverage = _coverage(csv_path, data, date_bounds(start, end)[1])
+        _write_json(report_dir / MANIFEST, {"clave": key, "datos": coverage, "resumen": summary})
+        entries.append({"sitio": site, "directorio": str(report_dir), "en_cache": False, **summary})
+
+    for entry in entries:
+        entry["segundos_sitio"] = time.perf_counter() - t0
+    return entries
+
+
+def _index_html(entries, out: Path) -> str:
+    rows = []
+    for e in entries:
+        cov = e["calidad"]["cobertura"]
+        link = Path(e["directorio"]).relative_to(out).as_posix()
+        figures = " ".join(
+            f"<a href='{link}/{name}'>{Path(name).stem}</a>" for name in e["figuras"] if name.endswith(".html")
+        )
+        rows.append(
+            f"<tr><td>{e['sitio']}</td><td>{e['rango'][0]} – {e['rango'][1]}</td>"
+            f"<td>{e['muestras']:,}</td><td>{'—' if cov is None or np.isnan(cov) else f'{cov:.1%}'}</td>"
+            f"<td>{e['episodios']}</td><td>{sum(e['eventos'].values())}</td>"
+            f"<td><a href='{link}/resumen.json'>resumen</a> {figures}</td></tr>"
+        )
+    return (
+        "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>"
+        "<title>Informes de calidad del aire</title></head><body>"
+        "<h1>Informes de calidad del aire</h1><table border='1' cellpadding='4'>"
+        "<tr><th>Sitio</th><th>Rango</th><th>Muestras</th><th>Cobertura</th>"
+        "<th>Episodios OMS</th><th>Eventos</th><th>Ficheros</th></tr>"
+        + "".join(rows) + "</table></body></html>"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", nargs="+", help="ficheros CSV de mediciones (uno por sitio)")
+    parser.add_argument("--range", action="append", type=parse_range, default=[],
+                        help="INICIO:FIN en formato AAAA-MM-DD (se puede repetir)")
+    parser.add_argument("--last-days", type=int, default=0,
+                        help="informe de los N últimos días con datos de cada fichero")
+    parser.add_argument("--resample", choices=RESAMPLE_OPTIONS, default="1H")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--workers", type=int, help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--png", action="store_true", help="exportar también las figuras en PNG (requiere kaleido)")
+    parser.add_argument("--force", action="store_true", help="regenerar aunque el informe esté al día")
+    args = parser.parse_args(argv)
+
+    if args.png and not png_available():
+        print("kaleido no está instalado: solo se generan figuras HTML")
+        args.png = False
+
+    t0 = time.perf_counter()
+    jobs = [
+        (p, site, args.range, args.last_days, args.out, args.resample, args.png, args.force)
+        for p, site in zip(args.csv, site_ids(args.csv))
+    ]
+    if len(jobs) < 2 or args.workers == 1:
+        results = [site_reports(*job) for job in jobs]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+                results = list(pool.map(site_reports, *zip(*jobs)))
+        except BrokenProcessPool:
+            # Sin procesos disponibles: se generan en este proceso
+            results = [site_reports(*job) for job in jobs]
+
+    entries = [e for site in results for e in site]
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    _write_json(out / "indice.json", entries)
+    (out / "index.html").write_text(_index_html(entries, out), encoding="utf-8")
+
+    for e in entries:
+        status = "en caché" if e["en_cache"] else f"{e['segundos_sitio']:.1f} s"
+        print(f"{e['sitio']:<24} {e['rango'][0]} – {e['rango'][1]}  {e['muestras']:>9,} muestras  {status}")
+    print(f"{len(entries)} informes en {out} ({time.perf_counter() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
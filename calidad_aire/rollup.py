@@ -0,0 +1,296 @@
+"""Pirámide de agregados por intervalos de tiempo (resample precalculado).
+
+Para cada intervalo del selector de resample se guarda, por cubo de tiempo y
+canal, la suma, el número de valores válidos, el mínimo y el máximo. El nivel
+más fino se calcula una sola vez a partir de las muestras; los niveles más
+gruesos se derivan del anterior, nunca de las filas originales.
+
+Los cubos están alineados a epoch UTC, igual que ``DataFrame.resample`` con
+intervalos que dividen el día, y los niveles son densos (un cubo por
+intervalo, aunque esté vacío), así que una consulta por rango es un slice.
+
+``RollupEngine`` mantiene la pirámide de un conjunto de datos que crece por el
+final: en cada ``update`` solo agrega las filas nuevas, por bloques de
+``CHUNK_ROWS`` filas, y las combina con los niveles guardados; solo cambian el
+último cubo de cada nivel y los que se añaden.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .query import epoch_ns
+from .schema import COVERAGE_COL, SENSOR_COLS, TIMESTAMP_COL
+
+_NS_PER_S = 1_000_000_000
+# Filas agregadas de una vez: acota los temporales de ``base_tier``
+CHUNK_ROWS = 1 << 20
+
+# Opciones del selector de resample -> duración del cubo en segundos
+RESAMPLE_SECONDS = {
+    "30min": 1800,
+    "1H": 3600,
+    "2H": 7200,
+    "6H": 21600,
+    "1D": 86400,
+}
+
+
+class Tier:
+    """Un nivel de la pirámide: arrays densos ``(cubos, canales)``.
+
+    ``first`` es el índice global (``epoch // seconds``) del primer cubo y
+    ``rows`` el número de muestras de cada cubo, tengan o no valores válidos.
+    """
+
+    def __init__(self, seconds, first, rows, sum, count, min, max):
+        self.seconds = seconds
+        self.first = first
+        self.rows = rows
+        self.sum = sum
+        self.count = count
+        self.min = min
+        self.max = max
+
+    def __len__(self):
+        return len(self.rows)
+
+    def bounds(self, start, end) -> tuple[int, int]:
+        """Filas ``[i, j)`` de los cubos que empiezan entre ``start`` y ``end``,
+        sin los cubos vacíos de los extremos (como hace ``resample``)."""
+        lo = -(-pd.Timestamp(start).value // (self.seconds * _NS_PER_S))
+        hi = pd.Timestamp(end).value // (self.seconds * _NS_PER_S)
+        i = int(np.clip(lo - self.first, 0, len(self)))
+        j = int(np.clip(hi - self.first + 1, i, len(self)))
+        nonempty = np.flatnonzero(self.rows[i:j])
+        if not len(nonempty):
+            return i, i
+        return i + int(nonempty[0]), i + int(nonempty[-1]) + 1
+
+    def timestamps(self, i: int, j: int) -> pd.DatetimeIndex:
+        ns = (np.arange(self.first + i, self.first + j) * self.seconds) * _NS_PER_S
+        return pd.DatetimeIndex(ns.view("datetime64[ns]")).tz_localize("UTC")
+
+    def coarsen(self, seconds: int) -> "Tier":
+        """Deriva un nivel más grueso (``seconds`` múltiplo del actual)."""
+        factor = seconds // self.seconds
+        if factor * self.seconds != seconds:
+            raise ValueError(f"{seconds}s no es múltiplo de {self.seconds}s")
+        if not len(self):
+            return Tier(seconds, 0, self.rows, self.sum, self.count, self.min, self.max)
+        groups = (self.first + np.arange(len(self))) // factor
+        starts = segment_starts(groups)
+        first = int(groups[0])
+        dense = groups[starts] - first
+        n = int(dense[-1]) + 1
+        return Tier(
+            seconds,
+            first,
+            _scatter(np.add.reduceat(self.rows, starts), dense, n, 0),
+            _scatter(np.add.reduceat(self.sum, starts), dense, n, 0.0),
+            _scatter(np.add.reduceat(self.count, starts), dense, n, 0),
+            _scatter(np.fmin.reduceat(self.min, starts), dense, n, np.nan),
+            _scatter(np.fmax.reduceat(self.max, starts), dense, n, np.nan),
+        )
+
+
+class Pyramid:
+    """Niveles de agregación de un conjunto de mediciones."""
+
+    def __init__(self, columns, tiers):
+        self.columns = list(columns)
+        self.tiers = {tier.seconds: tier for tier in tiers}
+
+    def _frame(self, tier, i, j, values) -> pd.DataFrame:
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, TIMESTAMP_COL, tier.timestamps(i, j))
+        return df
+
+    def mean(self, seconds: int, start, end, rate: float | None = None) -> pd.DataFrame:
+        """Media por cubo entre ``start`` y ``end``; equivale a
+        ``resample(...).mean()`` sobre las muestras del rango.
+
+        Con ``rate`` (muestras esperadas por segundo) se añade la columna
+        ``cobertura``: muestras del cubo frente a las esperadas, hasta 1.
+        """
+        tier = self.tiers[seconds]
+        i, j = tier.bounds(start, end)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = tier.sum[i:j] / tier.count[i:j]
+        df = self._frame(tier, i, j, values)
+        if rate is not None:
+            df[COVERAGE_COL] = np.minimum(tier.rows[i:j] / (seconds * rate), 1.0)
+        return df
+
+    def envelope(self, seconds: int, start, end) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Mínimo y máximo por cubo entre ``start`` y ``end``."""
+        tier = self.tiers[seconds]
+        i, j = tier.bounds(start, end)
+        return (
+            self._frame(tier, i, j, tier.min[i:j]),
+            self._frame(tier, i, j, tier.max[i:j]),
+        )
+
+
+def segment_starts(keys: np.ndarray) -> np.ndarray:
+    """Posiciones donde empieza cada tramo de claves iguales (claves ordenadas)."""
+    if not len(keys):
+        return np.zeros(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def _scatter(values: np.ndarray, rows: np.ndarray, n: int, fill) -> np.ndarray:
+    out = np.full((n,) + values.shape[1:], fill, dtype=values.dtype)
+    out[rows] = values
+    return out
+
+
+def base_tier(df: pd.DataFrame, seconds: int, columns) -> Tier:
+    """Nivel más fino, calculado a partir de las muestras ordenadas.
+
+    Se recorre un canal cada vez, así que los temporales son de una columna.
+    """
+    keys = epoch_ns(df) // (seconds * _NS_PER_S)
+    n_ch = len(columns)
+
+    if not len(keys):
+        empty = np.zeros((0, n_ch))
+        return Tier(seconds, 0, np.zeros(0, dtype=np.int64), empty,
+                    empty.astype(np.int64), empty, empty)
+
+    starts = segment_starts(keys)
+    first = int(keys[0])
+    dense = keys[starts] - first
+    n = int(dense[-1]) + 1
+    rows = np.diff(np.r_[starts, len(keys)])
+    tier = _empty_tier(seconds, first, n, n_ch)
+    tier.rows[dense] = rows
+    for c, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        tier.sum[dense, c] = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        tier.count[dense, c] = np.add.reduceat(valid, starts, dtype=np.int64)
+        tier.min[dense, c] = np.fmin.reduceat(values, starts)
+        tier.max[dense, c] = np.fmax.reduceat(values, starts)
+    return tier
+
+
+def _empty_tier(seconds: int, first: int, n: int, n_ch: int) -> Tier:
+    return Tier(
+        seconds,
+        first,
+        np.zeros(n, dtype=np.int64),
+        np.zeros((n, n_ch)),
+        np.zeros((n, n_ch), dtype=np.int64),
+        np.full((n, n_ch), np.nan),
+        np.full((n, n_ch), np.nan),
+    )
+
+
+class _GrowingTier:
+    """Un nivel con capacidad de reserva al que se añaden cubos por el final.
+
+    ``extend`` combina un nivel parcial que empieza en el último cubo guardado
+    o después; ``tier()`` devuelve vistas de los cubos actuales.
+    """
+
+    def __init__(self, seconds: int, n_ch: int):
+        self.seconds = seconds
+        self.n_ch = n_ch
+        self.n = 0
+        self._data = _empty_tier(seconds, 0, 0, n_ch)
+
+    def extend(self, part: Tier) -> None:
+        if not len(part):
+            return
+        if not self.n:
+            self._data.first = part.first
+        offset = part.first - self._data.first
+        if offset < self.n - 1:
+            raise ValueError("los cubos nuevos empiezan antes del último guardado")
+        end = offset + len(part)
+        if end > len(self._data):
+            self._grow(max(end, 2 * len(self._data)))
+        # El primer cubo nuevo puede ser el último guardado: se combinan
+        k = max(self.n - offset, 0)
+        d = self._data
+        if k:
+            d.rows[offset] += part.rows[0]
+            d.sum[offset] += part.sum[0]
+            d.count[offset] += part.count[0]
+            d.min[offset] = np.fmin(d.min[offset], part.min[0])
+            d.max[offset] = np.fmax(d.max[offset], part.max[0])
+        d.rows[offset + k:end] = part.rows[k:]
+        d.sum[offset + k:end] = part.sum[k:]
+        d.count[offset + k:end] = part.count[k:]
+        d.min[offset + k:end] = part.min[k:]
+        d.max[offset + k:end] = part.max[k:]
+        self.n = end
+
+    def _grow(self, capacity: int) -> None:
+        old = self._data
+        new = _empty_tier(self.seconds, old.first, capacity, self.n_ch)
+        for name in ("rows", "sum", "count", "min", "max"):
+            getattr(new, name)[: self.n] = getattr(old, name)[: self.n]
+        self._data = new
+
+    def tier(self) -> Tier:
+        d, n = self._data, self.n
+        return Tier(self.seconds, d.first, d.rows[:n], d.sum[:n], d.count[:n], d.min[:n], d.max[:n])
+
+
+class RollupEngine:
+    """Pirámide alineada con las filas de un DataFrame que crece por el final.
+
+    ``update(df, generation)`` solo agrega las filas añadidas desde la última
+    llamada mientras la generación de los datos no cambie (las filas anteriores
+    siguen siendo un prefijo); si cambia, recalcula todo. Los niveles que
+    devuelve son vistas: en una actualización posterior solo puede cambiar su
+    último cubo.
+    """
+
+    def __init__(self, columns=None, levels=None):
+        self.requested_columns = columns
+        self.levels = sorted(RESAMPLE_SECONDS.values() if levels is None else levels)
+        self.generation = None
+        self.columns = []
+        self.n = 0
+        self._tiers = None
+        self._lock = threading.Lock()
+
+    def update(self, df: pd.DataFrame, generation) -> Pyramid:
+        with self._lock:
+            columns = self.requested_columns
+            if columns is None:
+                columns = [c for c in SENSOR_COLS if c in df.columns]
+            columns = list(columns)
+            if (
+                self._tiers is None
+                or generation != self.generation
+                or columns != self.columns
+                or len(df) < self.n
+            ):
+                self.generation = generation
+                self.columns = columns
+                self.n = 0
+                self._tiers = [_GrowingTier(seconds, len(columns)) for seconds in self.levels]
+            for lo in range(self.n, len(df), CHUNK_ROWS):
+                self._extend(df.iloc[lo:lo + CHUNK_ROWS])
+            self.n = len(df)
+            return Pyramid(self.columns, [t.tier() for t in self._tiers])
+
+    def _extend(self, chunk: pd.DataFrame) -> None:
+        # Los niveles gruesos del bloque se derivan de su nivel fino, y cada
+        # uno se combina con el guardado: sumas, recuentos, mínimos y máximos
+        # de un cubo partido entre dos bloques se pueden juntar
+        part = base_tier(chunk, self.levels[0], self.columns)
+        for i, growing in enumerate(self._tiers):
+            if i:
+                part = part.coarsen(growing.seconds)
+            growing.extend(part)
+
+
+def build_pyramid(df: pd.DataFrame, columns=None, levels=None) -> Pyramid:
+    """Construye la pirámide; ``levels`` (segundos) de más fino a más grueso."""
+    return RollupEngine(columns, levels).update(df, None)
@@ -0,0 +1,29 @@
+"""Nombres de columnas del CSV de mediciones."""
+
+TIMESTAMP_COL = "timestamp"
+ID_COL = "id_medicion"
+# Identificador del nodo de adquisición (sala/edificio) al combinar varios ficheros
+SITE_COL = "sitio"
+# Etiqueta de evento detectada al cargar (ventilación, ocupación, pico PM)
+EVENT_COL = "Evento"
+# Fracción de las muestras esperadas presentes en cada cubo de resample
+COVERAGE_COL = "cobertura"
+
+# Canales de los sensores, en el orden en que aparecen en el CSV
+SENSOR_COLS = [
+    "temperatura_C",
+    "humedad_relativa_pct",
+    "CO2_ppm",
+    "PM1_ug_m3",
+    "PM2_5_ug_m3",
+    "PM4_ug_m3",
+    "PM10_ug_m3",
+]
+
+PM_COLS = ["PM1_ug_m3", "PM2_5_ug_m3", "PM4_ug_m3", "PM10_ug_m3"]
+
+# Columnas que el sistema de adquisición escribe pero que casi siempre llegan vacías
+OPTIONAL_COLS = ["latitude", "longitude", "elevation", "status"]
+
+# Columnas que necesita el dashboard
+DASHBOARD_COLS = [TIMESTAMP_COL, ID_COL] + SENSOR_COLS
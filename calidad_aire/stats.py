@@ -0,0 +1,80 @@
+"""Estadísticas descriptivas de todos los canales en una sola pasada.
+
+``describe`` calcula, sobre una matriz ``(muestras, canales)``, lo mismo que
+``DataFrame.describe()`` (recuento, media, desviación típica, mínimo,
+cuartiles y máximo) y además los bigotes de un diagrama de caja. Por cada
+canal se hace un único ``np.partition`` con todas las posiciones necesarias:
+de él salen el mínimo, los tres cuartiles, el máximo y los bigotes.
+"""
+
+import numpy as np
+import pandas as pd
+
+QUARTILES = (0.25, 0.5, 0.75)
+STAT_COLUMNS = [
+    "count", "mean", "std", "min", "q1", "median", "q3", "max",
+    "lowerfence", "upperfence",
+]
+
+
+def _positions(m: int, q: float) -> tuple[int, int, float]:
+    pos = q * (m - 1)
+    lo = int(np.floor(pos))
+    return lo, min(lo + 1, m - 1), pos - lo
+
+
+def quantiles(v: np.ndarray, qs) -> np.ndarray:
+    """Cuantiles ``qs`` (interpolación lineal) de ``v`` sin NaN, con una sola partición."""
+    m = len(v)
+    if not m:
+        return np.full(len(qs), np.nan)
+    pos = [_positions(m, q) for q in qs]
+    part = np.partition(v, sorted({p for lo, hi, _ in pos for p in (lo, hi)}))
+    return np.array([part[lo] + (part[hi] - part[lo]) * frac for lo, hi, frac in pos])
+
+
+def _column_order_stats(v: np.ndarray) -> list[float]:
+    """min, q1, mediana, q3, max y bigotes de los valores válidos ``v``."""
+    m = len(v)
+    if not m:
+        return [np.nan] * 7
+
+    pos = [_positions(m, q) for q in QUARTILES]
+    kth = sorted({0, m - 1, *(p for lo, hi, _ in pos for p in (lo, hi))})
+    part = np.partition(v, kth)
+    q1, med, q3 = (part[lo] + (part[hi] - part[lo]) * frac for lo, hi, frac in pos)
+
+    # Bigotes como en Plotly: el dato más extremo dentro de 1.5 IQR. Tras la
+    # partición, los valores por debajo de Q1 están a la izquierda de su
+    # posición y los de encima de Q3 a la derecha.
+    iqr = q3 - q1
+    below = part[: pos[0][1] + 1]
+    above = part[pos[2][0]:]
+    lower = below[below >= q1 - 1.5 * iqr].min()
+    upper = above[above <= q3 + 1.5 * iqr].max()
+    return [part[0], q1, med, q3, part[m - 1], lower, upper]
+
+
+def describe(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Estadísticas por canal (filas) en el orden de ``STAT_COLUMNS``."""
+    columns = list(columns)
+    values = df[columns].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+
+    count = valid.sum(axis=0)
+    filled = np.where(valid, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=0) / count
+        dev = np.where(valid, values - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=0) / (count - 1))
+    std[count < 2] = np.nan
+
+    order = np.array(
+        [_column_order_stats(values[valid[:, k], k]) for k in range(len(columns))]
+    ).reshape(len(columns), 7)
+
+    return pd.DataFrame(
+        np.column_stack([count, mean, std, order[:, 0], order[:, 1:5], order[:, 5:]]),
+        index=columns,
+        columns=STAT_COLUMNS,
+    )
@@ -0,0 +1,233 @@
+"""Almacén columnar (Parquet) de las mediciones.
+
+El CSV de adquisición se convierte una sola vez a un fichero Parquet junto a él
+(``mediciones.csv`` -> ``mediciones.parquet``) con tipos explícitos:
+
+- ``timestamp``: int64, segundos epoch UTC (ya ordenados).
+- ``id_medicion``: int64.
+- Canales de sensores: float32.
+- Las columnas opcionales (``latitude``, ``longitude``, ``elevation``,
+  ``status``) solo se guardan si traen algún valor.
+
+En los metadatos del Parquet se guarda el tamaño y la fecha de modificación
+del CSV de origen; si el CSV cambia, el almacén se considera obsoleto y se
+vuelve a generar. También se guarda hasta qué byte del CSV se ha convertido y
+un hash de su cabecera, de modo que ``calidad_aire.ingest`` puede reutilizar el
+almacén y leer solo las filas añadidas después.
+
+Uso desde la línea de comandos::
+
+    python -m calidad_aire.storage data/mediciones_completas_etiquetadas.csv
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .schema import ID_COL, OPTIONAL_COLS, SENSOR_COLS, TIMESTAMP_COL
+
+STORE_SUFFIX = ".parquet"
+_META_KEY = b"calidad_aire"
+_NS_PER_S = 1_000_000_000
+HEAD_BYTES = 4096
+# Se incrementa cuando cambia el contenido del almacén o de sus metadatos
+STORE_FORMAT = 2
+
+
+def store_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(STORE_SUFFIX)
+
+
+def source_signature(csv_path) -> dict:
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def head_digest(csv_path, nbytes: int) -> str:
+    """Hash de los primeros ``nbytes`` del CSV, para detectar reescrituras."""
+    with open(csv_path, "rb") as f:
+        return hashlib.sha1(f.read(nbytes)).hexdigest()
+
+
+def read_complete_lines(csv_path, start: int = 0, end: int | None = None):
+    """Lee el CSV desde ``start`` hasta la última línea completa.
+
+    Devuelve los bytes leídos y el offset en el que termina la última línea
+    completa; una línea a medio escribir por el sistema de adquisición se deja
+    para la siguiente lectura.
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read() if end is None else f.read(max(end - start, 0))
+    cut = data.rfind(b"\n") + 1
+    return data[:cut], start + cut
+
+
+def read_metadata(store) -> dict | None:
+    """Metadatos del almacén, o ``None`` si no existe o no es legible."""
+    try:
+        meta = pq.read_schema(store).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = meta.get(_META_KEY)
+    return json.loads(raw) if raw else None
+
+
+def is_fresh(csv_path, store=None) -> bool:
+    """Indica si el almacén existe y corresponde a la versión actual del CSV."""
+    store = store_path(csv_path) if store is None else Path(store)
+    meta = read_metadata(store)
+    if meta is None or meta.get("format") != STORE_FORMAT:
+        return False
+    return meta.get("source") == source_signature(csv_path)
+
+
+def covers_prefix(csv_path, meta: dict | None) -> bool:
+    """Indica si el almacén descrito por ``meta`` sigue siendo un prefijo del CSV.
+
+    Es el caso habitual cuando el sistema de adquisición solo ha añadido filas
+    desde la conversión: el almacén se puede reutilizar y leer solo la cola.
+    """
+    if meta is None or meta.get("format") != STORE_FORMAT:
+        return False
+    if os.stat(csv_path).st_size < meta["offset"]:
+        return False
+    return head_digest(csv_path, meta["head_len"]) == meta["head"]
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica los tipos del almacén a un DataFrame leído del CSV."""
+    df[TIMESTAMP_COL] = pd.to_datetime(df[TIMESTAMP_COL], errors="coerce", utc=True)
+    df = df.dropna(subset=[TIMESTAMP_COL]).sort_values(TIMESTAMP_COL, kind="stable")
+    df[TIMESTAMP_COL] = df[TIMESTAMP_COL].astype("datetime64[ns, UTC]")
+
+    if ID_COL in df.columns:
+        df[ID_COL] = pd.to_numeric(df[ID_COL], errors="coerce").astype("Int64")
+        if not df[ID_COL].hasnans:
+            df[ID_COL] = df[ID_COL].astype("int64")
+
+    for col in SENSOR_COLS + OPTIONAL_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+
+    empty = [c for c in OPTIONAL_COLS if c in df.columns and df[c].isna().all()]
+    return df.drop(columns=empty).reset_index(drop=True)
+
+
+def parse_csv(path) -> pd.DataFrame:
+    return _parse_source(path)[0]
+
+
+def _parse_source(path):
+    source = source_signature(path)
+    data, offset = read_complete_lines(path, end=source["size"])
+    df = normalize(pd.read_csv(io.BytesIO(data)))
+    head_len = min(HEAD_BYTES, offset)
+    source.update(
+        offset=offset,
+        head_len=head_len,
+        head=hashlib.sha1(data[:head_len]).hexdigest(),
+    )
+    return df, source
+
+
+def write_store(df: pd.DataFrame, store, source: dict) -> None:
+    """Escribe el almacén de forma atómica (fichero temporal + rename).
+
+    ``source`` describe el CSV de origen (ver ``_parse_source``).
+    """
+    store = Path(store)
+    columns = {TIMESTAMP_COL: df[TIMESTAMP_COL].array.asi8 // _NS_PER_S}
+    for col in df.columns:
+        if col != TIMESTAMP_COL:
+            columns[col] = pa.array(df[col])
+
+    table = pa.table(columns)
+    info = {
+        "format": STORE_FORMAT,
+        "source": {"size": source["size"], "mtime_ns": source["mtime_ns"]},
+        "offset": source["offset"],
+        "head_len": source["head_len"],
+        "head": source["head"],
+        "timestamp_unit": "s",
+    }
+    meta = {_META_KEY: json.dumps(info).encode()}
+    table = table.replace_schema_metadata(meta)
+
+    tmp = store.with_name(store.name + ".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, store)
+
+
+def read_store(store, columns=None) -> pd.DataFrame:
+    """Lee el almacén, opcionalmente solo las columnas indicadas."""
+    if columns is not None:
+        available = pq.read_schema(store).names
+        columns = [c for c in columns if c in available]
+    df = pq.read_table(store, columns=columns).to_pandas()
+    if TIMESTAMP_COL in df.columns:
+        epoch = df[TIMESTAMP_COL].to_numpy(dtype=np.int64)
+        df[TIMESTAMP_COL] = pd.DatetimeIndex(
+            (epoch * _NS_PER_S).view("datetime64[ns]")
+        ).tz_localize("UTC")
+    return df
+
+
+def convert(csv_path, store=None) -> Path:
+    """Convierte el CSV al almacén columnar y devuelve su ruta."""
+    store = store_path(csv_path) if store is None else Path(store)
+    df, source = _parse_source(csv_path)
+    write_store(df, store, source)
+    return store
+
+
+def load_measurements(csv_path, columns=None) -> pd.DataFrame:
+    """Carga las mediciones desde el almacén columnar.
+
+    Solo se recurre al CSV cuando el almacén falta o está obsoleto; en ese caso
+    se regenera para la próxima carga.
+    """
+    store = store_path(csv_path)
+    if is_fresh(csv_path, store):
+        return read_store(store, columns)
+
+    df, source = _parse_source(csv_path)
+    try:
+        write_store(df, store, source)
+    except OSError:
+        # Directorio de solo lectura: seguimos trabajando con el CSV
+        pass
+
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convierte CSV de mediciones al almacén columnar (Parquet)."
+    )
+    parser.add_argument("csv", nargs="+", help="ficheros CSV de mediciones")
+    parser.add_argument(
+        "--force", action="store_true", help="regenerar aunque el almacén esté al día"
+    )
+    args = parser.parse_args(argv)
+
+    for csv_path in args.csv:
+        if not args.force and is_fresh(csv_path):
+            print(f"{csv_path}: al día")
+            continue
+        store = convert(csv_path)
+        print(f"{csv_path} -> {store}")
+
+
+if __name__ == "__main__":
+    main()
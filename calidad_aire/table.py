@@ -0,0 +1,52 @@
+"""Tabla de datos paginada.
+
+Solo se selecciona y se formatea la página visible, de modo que el coste de
+cada interacción depende del tamaño de página y no del número de filas
+filtradas.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .schema import TIMESTAMP_COL
+
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def sort_order(df: pd.DataFrame, column: str, ascending: bool = True) -> np.ndarray:
+    """Permutación que ordena ``df`` por ``column`` (NaN al final)."""
+    values = df[column].to_numpy(dtype=np.float64)
+    return np.argsort(values if ascending else -values, kind="stable")
+
+
+def table_page(df: pd.DataFrame, page: int, page_size: int, order=None, columns=None,
+               descending: bool = False) -> pd.DataFrame:
+    """Filas de la página ``page`` (desde 1), con la marca de tiempo formateada.
+
+    ``order`` es una permutación opcional de ``sort_order``; sin ella se usa el
+    orden temporal de ``df`` (al revés con ``descending``, calculando solo las
+    filas de la página).
+    """
+    lo = (page - 1) * page_size
+    hi = min(lo + page_size, len(df))
+    if order is not None:
+        rows = order[lo:hi]
+    elif descending:
+        rows = np.arange(len(df) - 1 - lo, len(df) - 1 - hi, -1)
+    else:
+        rows = np.arange(lo, hi)
+
+    page_df = df.iloc[rows]
+    if columns is not None:
+        page_df = page_df[list(columns)]
+    if TIMESTAMP_COL in page_df.columns:
+        page_df = page_df.assign(
+            **{TIMESTAMP_COL: page_df[TIMESTAMP_COL].dt.strftime(TIMESTAMP_FORMAT)}
+        )
+    return page_df